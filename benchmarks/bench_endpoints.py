@@ -0,0 +1,263 @@
+"""
+Benchmark the bridge's HTTP endpoints against a local mock of tile.openweathermap.org.
+
+Usage (from the repository root):
+    python benchmarks/bench_endpoints.py [--requests 200] [--concurrency 1,8,32]
+                                         [--sizes 256,512,1024] [--latency-ms 50]
+                                         [--error-rate 0.01] [--transparent-rate 0.5]
+                                         [--output results.json] [--compare old.json]
+
+Starts benchmarks/mock_owm.py and the bridge (with a generated config.ini pointing at the
+mock) as subprocesses. It then measures throughput and p50/p95/p99 latency for the standard,
+nowcast and stitched TopSky endpoints at each concurrency level. The in-memory caches are
+disabled by default so every request goes through the fetch and render path; use
+--cache-mb to measure with caching. Results are written as JSON. Pass an earlier results
+file to --compare to print the change per scenario.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from mock_owm import add_arguments as add_mock_arguments
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+CONFIG_TEMPLATE = """\
+[openweathermap]
+api_key = benchmark
+tile_layer = precipitation_new
+
+[server]
+base_url = {base_url}
+
+[upstream]
+url = {upstream_url}
+http2 = false
+
+[cache]
+memory_mb = {cache_mb}
+stitched_memory_mb = {cache_mb}
+
+[logging]
+level = ERROR
+access_log = false
+"""
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Process serving {url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+def scenario_urls(endpoint: str, size: int, count: int, radar_path: str, nowcast_path: str) -> List[str]:
+    """Spread requests over distinct tiles/centres across Europe so they don't all hit one image."""
+    urls = []
+    for i in range(count):
+        if endpoint == "stitched":
+            lat = 44.0 + (i * 7 % 23) * 0.5
+            lon = -6.0 + (i * 11 % 41) * 0.5
+            urls.append(f"{radar_path}/{size}/6/{lat:.2f}/{lon:.2f}/.png")
+        else:
+            x = 28 + i % 12
+            y = 18 + (i // 12) % 8
+            z = 6 + (i // 96) % 2
+            base = radar_path if endpoint == "standard" else nowcast_path
+            urls.append(f"{base}/{z}/{x}/{y}.png")
+    return urls
+
+async def run_scenario(base_url: str, urls: List[str], concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while True:
+            try:
+                url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                resp = await client.get(url)
+                if resp.status_code != 200 or not resp.content.startswith(b"\x89PNG"):
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(urls),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(urls) / duration, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+def bridge_version() -> str:
+    with open(os.path.join(REPO_ROOT, "main.py"), encoding="utf-8") as f:
+        match = re.search(r'^__version__ = "([^"]+)"', f.read(), re.MULTILINE)
+    return match.group(1) if match else "unknown"
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def scenario_key(result: Dict) -> tuple:
+    return result["endpoint"], result["size"], result["concurrency"]
+
+def print_comparison(results: List[Dict], previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {scenario_key(r): r for r in json.load(f)["results"]}
+    print(f"\nChange against {previous_path}:")
+    print(f"{'endpoint':>9} {'size':>5} {'conc':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for result in results:
+        old = previous.get(scenario_key(result))
+        if old is None:
+            continue
+        changes = [
+            (result[field] - old[field]) / old[field] * 100 if old[field] else 0.0
+            for field in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{result['endpoint']:>9} {result['size']:>5} {result['concurrency']:>5} "
+              + " ".join(f"{change:>+8.1f}%" for change in changes))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--sizes", default="256,512,1024", help="comma-separated stitched image sizes")
+    parser.add_argument("--endpoints", default="standard,nowcast,stitched", help="endpoints to measure")
+    parser.add_argument("--cache-mb", type=int, default=0, help="bridge memory cache budget (0 disables caching)")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    concurrency_levels = [int(value) for value in args.concurrency.split(",")]
+    sizes = [int(value) for value in args.sizes.split(",")]
+    endpoints = [value.strip() for value in args.endpoints.split(",")]
+
+    mock_port, bridge_port = free_port(), free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    bridge_url = f"http://127.0.0.1:{bridge_port}"
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            mock = subprocess.Popen([
+                sys.executable, os.path.join(BENCH_DIR, "mock_owm.py"), "--port", str(mock_port),
+                "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                "--error-rate", str(args.error_rate), "--transparent-rate", str(args.transparent_rate),
+            ])
+            processes.append(mock)
+            wait_until_ready(f"{mock_url}/stats", mock)
+
+            with open(os.path.join(workdir, "config.ini"), "w", encoding="utf-8") as f:
+                f.write(CONFIG_TEMPLATE.format(base_url=bridge_url, upstream_url=mock_url, cache_mb=args.cache_mb))
+            env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+            bridge = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                 "--port", str(bridge_port), "--log-level", "warning"],
+                cwd=workdir, env=env,
+            )
+            processes.append(bridge)
+            wait_until_ready(f"{bridge_url}/health", bridge)
+
+            maps = httpx.get(f"{bridge_url}/public/weather-maps.json").json()
+            radar_path = maps["radar"]["past"][-1]["path"]
+            nowcast_path = maps["radar"]["nowcast"][0]["path"]
+
+            results = []
+            print(f"{'endpoint':>9} {'size':>5} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            for endpoint in endpoints:
+                for size in (sizes if endpoint == "stitched" else [256]):
+                    for concurrency in concurrency_levels:
+                        urls = scenario_urls(endpoint, size, args.requests, radar_path, nowcast_path)
+                        result = {"endpoint": endpoint, "size": size, "concurrency": concurrency}
+                        result.update(asyncio.run(run_scenario(bridge_url, urls, concurrency)))
+                        results.append(result)
+                        print(f"{endpoint:>9} {size:>5} {concurrency:>5} {result['throughput_rps']:>9.1f} "
+                              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                              f"{result['errors']:>7}")
+            upstream = httpx.get(f"{mock_url}/stats").json()
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=10)
+
+    report = {
+        "version": bridge_version(),
+        "git_commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests,
+            "cache_mb": args.cache_mb,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "transparent_rate": args.transparent_rate,
+        },
+        "upstream": upstream,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nUpstream requests: {upstream['requests']} ({upstream['errors']} errors, "
+          f"{upstream['transparent']} transparent). Results written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark the NumPy stitching engine against the previous Pillow paste loop.
+
+Usage (from the repository root):
+    python benchmarks/bench_stitch.py [--repeat N]
+
+Both engines stitch the same synthetic OWM-style tiles into 512, 1024 and 2048 px
+composites; the script checks the outputs are identical and prints the timings.
+The recolour, blend and encode stages work on a NumPy array, so the Pillow loop is timed
+both on its own and with the np.asarray copy it needs to feed them ("+array").
+PNG decoding dominates every engine: the NumPy engine is a few percent slower than the
+bare loop, which skips the transparent-tile detection, and faster than loop+array at larger
+sizes, where that copy grows.
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# main.py reads config.ini from the working directory and exits without an API key,
+# so import it from this folder with a placeholder key (no requests are made).
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+sys.path.insert(0, REPO_ROOT)
+
+from main import stitch_tiles  # noqa: E402
+from mock_owm import make_tile  # noqa: E402
+
+SIZES = (512, 1024, 2048)
+
+def make_placements(size: int):
+    """Lay tiles out the way create_stitched_tile does for an off-grid centre."""
+    top_left = 1000.3
+    start = int(top_left // 256)
+    end = int(-(-(top_left + size) // 256))
+    placements = []
+    for y in range(start, end + 1):
+        for x in range(start, end + 1):
+            placements.append((round(x * 256 - top_left), round(y * 256 - top_left), make_tile(x * 31 + y)))
+    return placements
+
+def stitch_pillow(placements, width: int, height: int) -> Image.Image:
+    """The previous implementation: convert each tile to RGBA and paste it."""
+    composite_image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    for paste_x, paste_y, tile_data in placements:
+        tile_image = Image.open(BytesIO(tile_data)).convert("RGBA")
+        composite_image.paste(tile_image, (paste_x, paste_y))
+    return composite_image
+
+def stitch_pillow_array(placements, width: int, height: int) -> np.ndarray:
+    """The Pillow loop producing the array the later stages need."""
+    return np.asarray(stitch_pillow(placements, width, height))
+
+def stitch_numpy(placements, width: int, height: int) -> np.ndarray:
+    return stitch_tiles(placements, width, height)[0]
+
+def best_of(func, repeat: int, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, best time is reported")
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'tiles':>6} {'pillow ms':>10} {'+array ms':>10} {'numpy ms':>10} {'vs pillow':>10} {'vs +array':>10}")
+    for size in SIZES:
+        placements = make_placements(size)
+        if not np.array_equal(stitch_pillow_array(placements, size, size), stitch_numpy(placements, size, size)):
+            raise SystemExit(f"Stitched output differs at {size}px")
+        pillow = best_of(stitch_pillow, args.repeat, placements, size, size)
+        pillow_array = best_of(stitch_pillow_array, args.repeat, placements, size, size)
+        numpy_time = best_of(stitch_numpy, args.repeat, placements, size, size)
+        print(f"{size:>6} {len(placements):>6} {pillow * 1000:>10.2f} {pillow_array * 1000:>10.2f} {numpy_time * 1000:>10.2f}"
+              f" {pillow / numpy_time:>9.2f}x {pillow_array / numpy_time:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
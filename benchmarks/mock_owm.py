@@ -0,0 +1,94 @@
+"""
+Local stand-in for tile.openweathermap.org, used by the endpoint benchmarks.
+
+Usage (from the repository root):
+    python benchmarks/mock_owm.py [--port 8099] [--latency-ms 50] [--jitter-ms 20]
+                                  [--error-rate 0.01] [--transparent-rate 0.5]
+
+Serves synthetic precipitation tiles at /{layer}/{z}/{x}/{y}.png. Point the bridge at it
+with `[upstream] url = http://127.0.0.1:8099`. Whether a tile is transparent is decided
+from its coordinates, so repeated runs see the same tiles; errors are random.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from io import BytesIO
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Response
+from PIL import Image
+
+# Same colours OWM uses for light to heavy precipitation
+COLOURS = ((120, 120, 190), (110, 110, 205), (80, 80, 225), (140, 70, 175), (255, 0, 60))
+
+def make_tile(seed: int) -> bytes:
+    """Create a 256px RGBA tile with a soft precipitation blob, similar to OWM output."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:256, 0:256]
+    cx, cy = rng.integers(0, 256, size=2)
+    distance = np.hypot(xx - cx, yy - cy)
+    alpha = np.clip(200 - distance * 2, 0, 200).astype(np.uint8)
+    pixels = np.zeros((256, 256, 4), dtype=np.uint8)
+    pixels[..., :3] = COLOURS[seed % len(COLOURS)]
+    pixels[..., 3] = alpha
+    buf = BytesIO()
+    Image.fromarray(pixels).save(buf, format="PNG")
+    return buf.getvalue()
+
+def make_transparent_tile() -> bytes:
+    buf = BytesIO()
+    Image.new("RGBA", (256, 256), (0, 0, 0, 0)).save(buf, format="PNG")
+    return buf.getvalue()
+
+def tile_fraction(layer: str, z: int, x: int, y: int) -> float:
+    """Stable pseudo-random number in [0, 1) for a tile."""
+    digest = hashlib.blake2b(f"{layer}/{z}/{x}/{y}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+def create_app(latency_ms: float, jitter_ms: float, error_rate: float, transparent_rate: float,
+               variants: int = 16) -> FastAPI:
+    app = FastAPI()
+    tiles = [make_tile(seed) for seed in range(variants)]
+    transparent = make_transparent_tile()
+    stats = {"requests": 0, "errors": 0, "transparent": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.get("/{layer}/{z}/{x}/{y}.png")
+    async def tile(layer: str, z: int, x: int, y: int):
+        stats["requests"] += 1
+        delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return Response(status_code=503)
+        fraction = tile_fraction(layer, z, x, y)
+        if fraction < transparent_rate:
+            stats["transparent"] += 1
+            return Response(content=transparent, media_type="image/png")
+        return Response(content=tiles[int(fraction * 2 ** 32) % len(tiles)], media_type="image/png")
+
+    return app
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="average upstream response time")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="random variation added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 503")
+    parser.add_argument("--transparent-rate", type=float, default=0.5, help="fraction of tiles without precipitation")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    add_arguments(parser)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.transparent_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,30 @@ import os
 import math
 import time
 from io import BytesIO
-from typing import Tuple, Dict, Any, Union
+from typing import Tuple, Dict, Any, Union, Optional, Hashable, List, Callable, Iterable, Iterator, Awaitable
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 import configparser
+import email.utils
+import functools
+import hashlib
+import json
+import logging
+import logging.handlers
+import multiprocessing
 import sys
+import queue
+import threading
+import uuid
+import atexit
+import contextvars
 import httpx
 from fastapi import FastAPI, Response, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from PIL import Image
+import numpy as np
 import asyncio
 
 # Add dotenv support to load .env file automatically (for development)
@@ -19,15 +35,19 @@ load_dotenv()
 # Application version
 __version__ = "1.0.2"
 
+CONFIG_FILE = "config.ini"
+
+logger = logging.getLogger("topsky_wxr_bridge")
+
 # Configuration loading with fallback to environment variables
 def load_config():
     """Load configuration from config.ini file or environment variables as fallback."""
     config = configparser.ConfigParser()
     
     # Try to load from config.ini first
-    config_file = "config.ini"
+    config_file = CONFIG_FILE
     if os.path.exists(config_file):
-        print(f"Loading configuration from {config_file}")
+        logger.info("Loading configuration from %s", config_file)
         config.read(config_file)
         
         # Get values from config file
@@ -36,24 +56,136 @@ def load_config():
         tile_layer = config.get('openweathermap', 'tile_layer', fallback="precipitation_new")
         
         if not api_key or api_key == "YOUR_API_KEY_HERE":
-            print("ERROR: Please edit config.ini and set your OpenWeatherMap API key")
-            print("Get your API key from: https://openweathermap.org/api")
+            logger.error("Please edit config.ini and set your OpenWeatherMap API key")
+            logger.error("Get your API key from: https://openweathermap.org/api")
             sys.exit(1)
             
         return api_key, base_url, tile_layer
     else:
         # Fallback to environment variables (for development)
-        print("config.ini not found, using environment variables")
+        logger.info("config.ini not found, using environment variables")
         api_key = os.getenv("OPENWEATHER_API_KEY")
         base_url = os.getenv("BASE_URL", "http://localhost:8000")
         tile_layer = os.getenv("TILE_LAYER", "precipitation_new")
         
         if not api_key:
-            print("ERROR: No API key found. Please create config.ini or set OPENWEATHER_API_KEY environment variable")
+            logger.error("No API key found. Please create config.ini or set OPENWEATHER_API_KEY environment variable")
             sys.exit(1)
             
         return api_key, base_url, tile_layer
 
+def config_get(section: str, option: str, fallback: str) -> str:
+    """
+    Read an optional setting from config.ini, or from the environment when config.ini is absent.
+    Environment variables are named SECTION_OPTION in upper case (e.g. UPSTREAM_MAX_CONNECTIONS).
+    """
+    if os.path.exists(CONFIG_FILE):
+        config = configparser.ConfigParser()
+        config.read(CONFIG_FILE)
+        return config.get(section, option, fallback=fallback)
+    return os.getenv(f"{section}_{option}".upper(), fallback)
+
+def config_getint(section: str, option: str, fallback: int) -> int:
+    """Read an optional integer setting, falling back to the default if it is missing or invalid."""
+    value = config_get(section, option, str(fallback))
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Invalid integer for [%s] %s: %r, using %s", section, option, value, fallback)
+        return fallback
+
+def config_getfloat(section: str, option: str, fallback: float) -> float:
+    """Read an optional float setting, falling back to the default if it is missing or invalid."""
+    value = config_get(section, option, str(fallback))
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Invalid number for [%s] %s: %r, using %s", section, option, value, fallback)
+        return fallback
+
+def config_getbool(section: str, option: str, fallback: bool) -> bool:
+    """Read an optional yes/no setting, falling back to the default if it is missing or invalid."""
+    value = config_get(section, option, str(fallback)).strip().lower()
+    if value in ("1", "yes", "true", "on"):
+        return True
+    if value in ("0", "no", "false", "off"):
+        return False
+    logger.warning("Invalid boolean for [%s] %s: %r, using %s", section, option, value, fallback)
+    return fallback
+
+# Correlation ID of the HTTP request being handled, attached to every log record
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request's correlation ID to log records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_STANDARD_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def console_handler() -> logging.Handler:
+    """A stdout handler formatted according to the [logging] json setting."""
+    console = logging.StreamHandler(sys.stdout)
+    if config_getbool("logging", "json", False):
+        console.setFormatter(JsonFormatter())
+    else:
+        console.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(request_id)s] %(message)s"))
+    return console
+
+def setup_logging() -> None:
+    """
+    Configure the application and uvicorn loggers from the [logging] settings. Records go through
+    a queue to a background listener thread, so request handlers never block on console writes.
+    """
+    level_name = config_get("logging", "level", "INFO").strip().upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        level = logging.INFO
+    console = console_handler()
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=False)
+    listener.start()
+    # Flush queued records on exit, including the sys.exit() in load_config
+    atexit.register(listener.stop)
+
+    # uvicorn's server messages (uvicorn.error propagates to uvicorn) share the queue; its
+    # own access log is turned off in favour of ours
+    for name in (logger.name, "uvicorn"):
+        target = logging.getLogger(name)
+        target.handlers = [queue_handler]
+        target.setLevel(level)
+        target.propagate = False
+    if level_name != logging.getLevelName(level):
+        logger.warning("Invalid [logging] level: %r, using INFO", level_name)
+
+setup_logging()
+
+# One access log line per request at INFO level (true/false)
+ACCESS_LOG = config_getbool("logging", "access_log", True)
+
 # Load configuration
 OPENWEATHER_API_KEY, BASE_URL, TILE_LAYER = load_config()
 # Available OWM tile layers:
@@ -63,11 +195,1101 @@ OPENWEATHER_API_KEY, BASE_URL, TILE_LAYER = load_config()
 # - "wind_new" = Wind speed
 # - "pressure_new" = Atmospheric pressure
 # - "humidity_new" = Relative humidity
+OWM_LAYERS = ("precipitation_new", "clouds_new", "temp_new", "wind_new", "pressure_new", "humidity_new")
+
+# Image size configured in TopSky (WXR_ImageSize), used to pre-encode matching blank tiles
+TOPSKY_IMAGE_SIZE = config_getint("topsky", "image_size", 512)
+
+# Upstream HTTP client settings. One pooled client is shared by every tile request
+# so radar refreshes reuse warm connections instead of paying TCP+TLS setup per tile.
+UPSTREAM_URL = config_get("upstream", "url", "https://tile.openweathermap.org/map").rstrip("/")
+UPSTREAM_HOST = httpx.URL(UPSTREAM_URL).host
+UPSTREAM_HTTP2 = config_getbool("upstream", "http2", True)
+UPSTREAM_TIMEOUT = config_getfloat("upstream", "timeout", 15.0)
+UPSTREAM_MAX_CONNECTIONS = config_getint("upstream", "max_connections", 100)
+UPSTREAM_MAX_KEEPALIVE = config_getint("upstream", "max_keepalive_connections", 20)
+UPSTREAM_KEEPALIVE_EXPIRY = config_getfloat("upstream", "keepalive_expiry", 30.0)
+
+# The application-lifetime client, created and closed by the lifespan hook
+http_client: Optional[httpx.AsyncClient] = None
+
+# CPU-bound Pillow work (decode/stitch/encode) runs on a bounded worker pool so a large
+# or slow image never blocks the event loop for other clients. A process pool lets large
+# stitched images use every core; the default thread pool has less overhead for small tiles.
+IMAGE_EXECUTOR = config_get("image", "executor", "thread").strip().lower()
+if IMAGE_EXECUTOR not in ("thread", "process"):
+    logger.warning("Invalid [image] executor: %r, using thread", IMAGE_EXECUTOR)
+    IMAGE_EXECUTOR = "thread"
+IMAGE_WORKERS = max(1, config_getint(
+    "image", "workers", (os.cpu_count() or 1) if IMAGE_EXECUTOR == "process" else min(4, os.cpu_count() or 1)
+))
+# Image jobs allowed to be queued or running at once; further requests wait for a slot
+IMAGE_MAX_QUEUE = max(IMAGE_WORKERS, config_getint("image", "max_queue", IMAGE_WORKERS * 4))
+image_executor: Optional[Executor] = None
+image_slots: Optional[asyncio.Semaphore] = None
+image_jobs_waiting = 0
+image_jobs_running = 0
+
+def init_image_worker() -> None:
+    """
+    Prepare an image worker process. It logs straight to the console: forked workers inherit the
+    queue handler but not the listener thread that drains it, so their records would be lost.
+    """
+    handler = console_handler()
+    handler.addFilter(RequestIdFilter())
+    logger.handlers = [handler]
+    # Already built when the worker was forked; spawned workers build them here, not per request
+    build_recolour_luts()
+
+def get_image_executor() -> Executor:
+    """Return the shared image executor, creating it on first use."""
+    global image_executor
+    if image_executor is None:
+        if IMAGE_EXECUTOR == "process":
+            image_executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, initializer=init_image_worker)
+        else:
+            image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+    return image_executor
+
+async def run_image_work(func, *args):
+    """
+    Run a CPU-bound image function on the image executor and await its result.
+    When IMAGE_MAX_QUEUE jobs are already queued or running, callers wait for a free slot,
+    which applies backpressure instead of growing an unbounded executor queue.
+    Functions and arguments must be picklable when the process executor is used.
+    """
+    global image_slots, image_jobs_waiting, image_jobs_running
+    if image_slots is None:
+        # Created lazily so the semaphore belongs to the running event loop
+        image_slots = asyncio.Semaphore(IMAGE_MAX_QUEUE)
+    image_jobs_waiting += 1
+    try:
+        await image_slots.acquire()
+    finally:
+        image_jobs_waiting -= 1
+    image_jobs_running += 1
+    try:
+        loop = asyncio.get_running_loop()
+        if IMAGE_EXECUTOR == "thread":
+            # Carry the request's context (correlation ID) into the worker thread's log records
+            return await loop.run_in_executor(get_image_executor(), contextvars.copy_context().run, func, *args)
+        return await loop.run_in_executor(get_image_executor(), func, *args)
+    finally:
+        image_jobs_running -= 1
+        image_slots.release()
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create the pooled upstream client, falling back to HTTP/1.1 if the h2 package is missing."""
+    http2 = UPSTREAM_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+            http2 = False
+    limits = httpx.Limits(
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(http2=http2, timeout=UPSTREAM_TIMEOUT, limits=limits)
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it lazily if the lifespan hook has not run."""
+    global http_client
+    if http_client is None:
+        http_client = create_http_client()
+    return http_client
+
+# Labels are passed as keyword arguments and stored as sorted (name, value) tuples
+LabelSet = Tuple[Tuple[str, str], ...]
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonically increasing Prometheus counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelSet, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+class Gauge:
+    """Prometheus gauge that goes up and down, with optional labels."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelSet, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+class CallbackMetric:
+    """
+    Counter or gauge whose values are read at scrape time from state kept elsewhere
+    (such as cache statistics). The callback returns (labels, value) pairs.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str,
+                 callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.callback():
+            yield f"{self.name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}"
+
+class Histogram:
+    """Prometheus histogram with cumulative buckets, a sum and a count per label set."""
+
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelSet, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        # Per-bucket counts followed by the sum and the total count
+        series = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = ("le", _format_value(bound) if bound == math.inf else repr(bound))
+                yield f"{self.name}_bucket{_format_labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}"
+            yield f"{self.name}_count{_format_labels(labels)} {series[-1]}"
+
+class MetricsRegistry:
+    """Collects metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+HTTP_REQUEST_DURATION = metrics.register(Histogram(
+    "wxr_http_request_duration_seconds", "Time to handle HTTP requests, by route, method and status."))
+HTTP_REQUESTS_IN_FLIGHT = metrics.register(Gauge(
+    "wxr_http_requests_in_flight", "HTTP requests currently being handled."))
+HTTP_RESPONSE_BYTES = metrics.register(Counter(
+    "wxr_http_response_bytes_total", "Response body bytes served, by route."))
+UPSTREAM_REQUEST_DURATION = metrics.register(Histogram(
+    "wxr_upstream_request_duration_seconds", "Time for upstream OWM tile requests, by layer."))
+UPSTREAM_RESPONSES = metrics.register(Counter(
+    "wxr_upstream_responses_total", "Upstream OWM tile responses, by layer and status code (error = no response)."))
+UPSTREAM_QUEUE_WAIT = metrics.register(Histogram(
+    "wxr_upstream_queue_wait_seconds", "Time upstream requests waited for the concurrency and rate limiter, by layer (all = shared limiter)."))
+STITCH_STAGE_DURATION = metrics.register(Histogram(
+    "wxr_stitch_stage_duration_seconds", "Time spent per stitched-image stage (fetch, decode, stitch, recolour, blend, encode)."))
+STALE_SERVED = metrics.register(Counter(
+    "wxr_stale_served_total", "Expired images served while a refresh was slow or failing, by cache."))
+
+# Optional per-stage tracing of stitched-tile requests
+TRACING_ENABLED = config_getbool("tracing", "enabled", False)
+TRACING_EXPORTER = config_get("tracing", "exporter", "none").strip().lower()
+if TRACING_EXPORTER not in ("none", "file", "otlp"):
+    logger.warning("Invalid [tracing] exporter: %r, using none", TRACING_EXPORTER)
+    TRACING_EXPORTER = "none"
+TRACING_FILE = config_get("tracing", "file", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = config_get("tracing", "otlp_endpoint", "http://localhost:4318/v1/traces")
+
+class Span:
+    """One timed stage of a traced request. Times are wall-clock nanoseconds."""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+
+    def server_timing(self, stages: Iterable[str]) -> str:
+        """Summarize total milliseconds per span name as a Server-Timing header value."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span.name in stages:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        root = self.spans[0]
+        parts = [f"{name.replace('.', '-')};dur={totals[name]:.1f}" for name in stages if name in totals]
+        parts.append(f"total;dur={root.duration_ms:.1f}")
+        return ", ".join(parts)
+
+# Innermost open span of the current request; child tasks inherit it through their context
+current_span_var: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Optional[Trace]]:
+    """Open the root span of a new trace if tracing is enabled, and export the trace when it ends."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace()
+    span = Span(trace, name, None, attributes)
+    trace.spans.append(span)
+    token = current_span_var.set(span)
+    try:
+        yield trace
+    finally:
+        span.end_ns = time.time_ns()
+        current_span_var.reset(token)
+        export_trace(trace)
+
+@contextmanager
+def trace_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Record a child span of the current span. Does nothing outside a traced request."""
+    parent = current_span_var.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace.spans.append(span)
+    token = current_span_var.set(span)
+    try:
+        yield span
+    finally:
+        span.end_ns = time.time_ns()
+        current_span_var.reset(token)
+
+def record_span(name: str, start_ns: int, end_ns: int, parent: Optional[Span] = None, **attributes: Any) -> None:
+    """Add an already-measured child span (e.g. a stage timed in an image worker) to parent or the current span."""
+    if parent is None:
+        parent = current_span_var.get()
+    if parent is None:
+        return
+    span = Span(parent.trace, name, parent.span_id, attributes)
+    span.start_ns, span.end_ns = start_ns, end_ns
+    parent.trace.spans.append(span)
+
+async def trace_httpx_event(event_name: str, info: Dict[str, Any]) -> None:
+    """
+    httpx/httpcore trace hook: turn connection events (TCP connect including DNS, TLS
+    handshake, request send, response headers/body) into spans under the current span.
+    """
+    parent = current_span_var.get()
+    if parent is None:
+        return
+    # Event names look like "connection.start_tls.started" / "http2.receive_response_headers.complete"
+    stage, _, phase = event_name.rpartition(".")
+    if phase == "started":
+        span = Span(parent.trace, f"http.{stage.split('.', 1)[-1]}", parent.span_id, {})
+        parent.trace.spans.append(span)
+        parent.attributes.setdefault("_open_http_spans", {})[stage] = span
+    elif phase in ("complete", "failed"):
+        span = parent.attributes.get("_open_http_spans", {}).pop(stage, None)
+        if span is not None:
+            span.end_ns = time.time_ns()
+            if phase == "failed":
+                span.attributes["error"] = True
+
+_trace_file_lock = threading.Lock()
+
+def _write_trace_file(line: str) -> None:
+    with _trace_file_lock:
+        with open(TRACING_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def trace_to_otlp(trace: Trace) -> Dict[str, Any]:
+    """Convert a trace to the OTLP/HTTP JSON request body."""
+    spans = []
+    for span in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 2 if span.parent_id is None else 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "topsky-wxr-bridge"}}]},
+            "scopeSpans": [{"scope": {"name": "topsky_wxr_bridge", "version": __version__}, "spans": spans}],
+        }]
+    }
+
+async def _post_otlp(body: Dict[str, Any]) -> None:
+    try:
+        resp = await get_http_client().post(TRACING_OTLP_ENDPOINT, json=body, timeout=5.0)
+        if resp.status_code >= 400:
+            logger.warning("Trace export to %s failed: HTTP %d", TRACING_OTLP_ENDPOINT, resp.status_code)
+    except httpx.HTTPError as e:
+        logger.warning("Trace export to %s failed: %s", TRACING_OTLP_ENDPOINT, e)
+
+_export_tasks: set = set()
+
+def export_trace(trace: Trace) -> None:
+    """Send a finished trace to the configured exporter in the background."""
+    for span in trace.spans:
+        span.attributes.pop("_open_http_spans", None)
+    if TRACING_EXPORTER == "file":
+        line = json.dumps({"trace_id": trace.trace_id, "spans": [span.to_dict() for span in trace.spans]}, default=str)
+        task = asyncio.ensure_future(asyncio.to_thread(_write_trace_file, line))
+    elif TRACING_EXPORTER == "otlp":
+        task = asyncio.ensure_future(_post_otlp(trace_to_otlp(trace)))
+    else:
+        return
+    # Keep a reference until the export finishes so the task isn't garbage collected
+    _export_tasks.add(task)
+    task.add_done_callback(_export_tasks.discard)
+
+class UpstreamLimiter:
+    """
+    Async context manager that bounds upstream OWM requests for one layer, or for all of them
+    (layer "all"): a semaphore caps how many are in flight and a token bucket caps the request rate (rate <= 0 disables it).
+    Records how long requests queued before being sent.
+    """
+
+    def __init__(self, layer: str, max_concurrent: int, rate: float, burst: int):
+        self.layer = layer
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reset(self) -> None:
+        """Drop the semaphore so it is recreated on the next event loop."""
+        self._semaphore = None
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self) -> "UpstreamLimiter":
+        if self._semaphore is None:
+            # Created lazily so the semaphore belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                if self.rate > 0:
+                    await self._take_token()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        UPSTREAM_QUEUE_WAIT.observe(waited, layer=self.layer)
+        self.active += 1
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "rate_limit": self.rate,
+            "active": self.active,
+            "waiting": self.waiting,
+            "requests": self.acquired,
+            "total_queue_wait_seconds": round(self.total_wait, 3),
+            "avg_queue_wait_seconds": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+            "max_queue_wait_seconds": round(self.max_wait, 3),
+        }
+
+# Keeps upstream load within OWM plan limits when many clients refresh large images at once.
+# The limits apply to the API key, so one limiter is shared by all layers. Each layer may only use
+# part of its concurrency, so a burst of requests for one layer can't starve the others.
+UPSTREAM_MAX_CONCURRENT_FETCHES = max(1, config_getint("upstream", "max_concurrent_fetches", 16))
+UPSTREAM_RATE_LIMIT = config_getfloat("upstream", "rate_limit", 0.0)
+UPSTREAM_RATE_BURST = config_getint("upstream", "rate_burst", 20)
+UPSTREAM_LAYER_MAX_CONCURRENT_FETCHES = max(1, min(
+    UPSTREAM_MAX_CONCURRENT_FETCHES,
+    config_getint("upstream", "layer_max_concurrent_fetches", max(1, UPSTREAM_MAX_CONCURRENT_FETCHES * 3 // 4)),
+))
+upstream_limiter = UpstreamLimiter("all", UPSTREAM_MAX_CONCURRENT_FETCHES, UPSTREAM_RATE_LIMIT, UPSTREAM_RATE_BURST)
+upstream_limiters: Dict[str, UpstreamLimiter] = {}
+
+def get_upstream_limiter(layer: str) -> UpstreamLimiter:
+    """Return the per-layer share of the upstream limit for `layer`, creating it on first use."""
+    limiter = upstream_limiters.get(layer)
+    if limiter is None:
+        # No rate of its own: the request rate is only limited globally
+        limiter = UpstreamLimiter(layer, UPSTREAM_LAYER_MAX_CONCURRENT_FETCHES, 0.0, 1)
+        upstream_limiters[layer] = limiter
+    return limiter
+
+# Radar frames are published in 10-minute buckets (see generate_timestamps)
+RADAR_BUCKET_SECONDS = 600
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending an upstream request while its circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream host and layer. Outcomes of recent requests are kept
+    for `window` seconds; once at least `min_requests` were seen and the share of failures
+    or slow responses reaches its threshold, the circuit opens and requests fail fast.
+    After `open_seconds` it lets `half_open_probes` requests through: if they all succeed the
+    circuit closes again, and any failure reopens it. Only those probes decide; requests admitted
+    before the circuit opened that finish late are ignored.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name: str, window: float, min_requests: int, error_rate: float,
+                 slow_call_seconds: float, slow_call_rate: float, open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.window = window
+        self.min_requests = max(1, min_requests)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = self.CLOSED
+        self._outcomes: "deque[Tuple[float, bool, bool]]" = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.trips = 0
+        self.rejected = 0
+        self.last_trip_reason: Optional[str] = None
+
+    def rejecting(self) -> bool:
+        """True (counting a rejection) while open and not yet due a probe, so callers can skip queueing."""
+        if self.state == self.OPEN and time.monotonic() - self._opened_at < self.open_seconds:
+            self.rejected += 1
+            return True
+        return False
+
+    def allow(self) -> Tuple[bool, bool]:
+        """
+        Return (allowed, probe): whether a request may be sent now, counting a rejection
+        otherwise, and whether it is a half-open probe. Pass `probe` back to record().
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                return False, False
+            self.state = self.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info("Upstream circuit %s half-open, probing", self.name)
+        if self.state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                return False, False
+            self._probes_in_flight += 1
+            return True, True
+        return True, False
+
+    def record(self, ok: Optional[bool], duration: float, probe: bool = False) -> None:
+        """
+        Record the outcome of an allowed request (None if it was cancelled before finishing).
+        `probe` is the flag allow() returned for it.
+        """
+        if probe:
+            # A probe outliving its half-open period (another probe failed) no longer counts
+            if self.state != self.HALF_OPEN:
+                return
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if ok is None:
+                return
+            if not ok:
+                self._trip("probe failed")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                logger.info("Upstream circuit %s closed, requests resumed", self.name)
+            return
+        # Requests admitted before the circuit opened don't count once it has
+        if ok is None or self.state != self.CLOSED:
+            return
+        now = time.monotonic()
+        self._outcomes.append((now, ok, duration >= self.slow_call_seconds))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        total = len(self._outcomes)
+        if total < self.min_requests:
+            return
+        failures = sum(1 for _, success, _ in self._outcomes if not success)
+        slow = sum(1 for _, _, is_slow in self._outcomes if is_slow)
+        if failures / total >= self.error_rate:
+            self._trip(f"{failures}/{total} requests failed")
+        elif slow / total >= self.slow_call_rate:
+            self._trip(f"{slow}/{total} requests took over {self.slow_call_seconds:g}s")
+
+    def _trip(self, reason: str) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+        self.last_trip_reason = reason
+        logger.warning("Upstream circuit %s opened (%s), failing fast for %gs", self.name, reason, self.open_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "recent_requests": len(self._outcomes),
+            "last_trip_reason": self.last_trip_reason,
+        }
+
+# Circuit breakers around OWM, one per (host, layer) so one failing layer doesn't block others
+CIRCUIT_BREAKER_ENABLED = config_getbool("circuit_breaker", "enabled", True)
+CIRCUIT_BREAKER_SETTINGS = {
+    "window": config_getfloat("circuit_breaker", "window", 30.0),
+    "min_requests": config_getint("circuit_breaker", "min_requests", 10),
+    "error_rate": config_getfloat("circuit_breaker", "error_rate", 0.5),
+    "slow_call_seconds": config_getfloat("circuit_breaker", "slow_call_seconds", 5.0),
+    "slow_call_rate": config_getfloat("circuit_breaker", "slow_call_rate", 0.8),
+    "open_seconds": config_getfloat("circuit_breaker", "open_seconds", 30.0),
+    "half_open_probes": config_getint("circuit_breaker", "half_open_probes", 1),
+}
+circuit_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+def get_circuit_breaker(host: str, layer: str) -> Optional[CircuitBreaker]:
+    """Return the breaker for requests to `host` for `layer`, or None when circuit breaking is disabled."""
+    if not CIRCUIT_BREAKER_ENABLED:
+        return None
+    breaker = circuit_breakers.get((host, layer))
+    if breaker is None:
+        breaker = CircuitBreaker(f"{host}/{layer}", **CIRCUIT_BREAKER_SETTINGS)
+        circuit_breakers[(host, layer)] = breaker
+    return breaker
+
+def is_upstream_failure(status_code: int) -> bool:
+    """Statuses that count against the circuit breaker: server errors, rate limiting and rejected keys."""
+    return status_code >= 500 or status_code in (401, 403, 429)
+
+def current_bucket(now: Optional[float] = None) -> int:
+    """Return the start of the 10-minute radar bucket containing `now` (defaults to the current time)."""
+    if now is None:
+        now = time.time()
+    return (int(now) // RADAR_BUCKET_SECONDS) * RADAR_BUCKET_SECONDS
+
+class ByteLRUCache:
+    """
+    In-memory LRU cache of byte strings bounded by total size rather than entry count.
+    Each entry carries an absolute expiry time. Expired entries are kept for another
+    `stale_seconds` so they can still be served stale (see get_stale), then dropped on access.
+    Only used from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, max_bytes: int, stale_seconds: float = 0.0):
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return the cached bytes for `key`, or None on a miss or if the entry has expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        now = time.time()
+        if expires_at <= now:
+            if expires_at + self.stale_seconds <= now:
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[bytes, float]]:
+        """Return `(value, expires_at)` for an expired entry still inside the staleness window, else None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        now = time.time()
+        if expires_at > now:
+            return None
+        if expires_at + self.stale_seconds <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, value: bytes, expires_at: float) -> None:
+        """Store `value` until `expires_at`, evicting least recently used entries to stay within budget."""
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at)
+        self.current_bytes += len(value)
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        value, _ = self._entries.pop(key)
+        self.current_bytes -= len(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current usage."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+# Stale-while-revalidate: once a radar bucket ends, its images may still be served for up to
+# CACHE_STALE_SECONDS while a refresh runs, if the refresh takes longer than CACHE_REVALIDATE_TIMEOUT
+CACHE_STALE_SECONDS = max(0.0, config_getfloat("cache", "stale_seconds", 1800.0))
+CACHE_REVALIDATE_TIMEOUT = max(0.0, config_getfloat("cache", "revalidate_timeout", 1.0))
+
+# Upstream OWM tiles, keyed by (layer, z, x, y) and shared by stitched and single-tile requests.
+# Each layer has its own partition and budget, so a busy layer can't evict another layer's tiles.
+# Entries expire at the end of the bucket they were fetched in.
+TILE_CACHE_MB = config_getfloat("cache", "memory_mb", 64.0)
+tile_caches: Dict[str, ByteLRUCache] = {}
+
+def get_tile_cache(layer: str) -> ByteLRUCache:
+    """Return the tile cache partition for `layer`, creating it on first use."""
+    cache = tile_caches.get(layer)
+    if cache is None:
+        cache = ByteLRUCache(int(TILE_CACHE_MB * 1024 * 1024), CACHE_STALE_SECONDS)
+        tile_caches[layer] = cache
+    return cache
+
+# Encoded stitched composites, keyed by (layer, width, height, zoom, snapped centre pixel, PNG profile)
+STITCHED_CACHE_MB = config_getfloat("cache", "stitched_memory_mb", 32.0)
+stitched_cache = ByteLRUCache(int(STITCHED_CACHE_MB * 1024 * 1024), CACHE_STALE_SECONDS)
+
+def tile_cache_key(layer: str, z: int, x: int, y: int) -> Tuple[str, int, int, int]:
+    """Key identifying one upstream tile in the tile caches."""
+    return (layer, z, x, y)
+
+class EmptyTileRegistry:
+    """
+    Remembers upstream tiles that decode to fully transparent images, so they can be
+    skipped without decoding. Payloads are recognised by digest (OWM tends to serve
+    identical bytes for every empty tile) and individual tiles by cache key until expiry.
+    """
+
+    def __init__(self, max_digests: int = 256, max_keys: int = 65536):
+        self.max_digests = max_digests
+        self.max_keys = max_keys
+        self._digests: "OrderedDict[bytes, None]" = OrderedDict()
+        self._keys: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.skipped = 0
+
+    @staticmethod
+    def digest(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def is_empty_key(self, key: Hashable) -> bool:
+        """Return True if the tile for `key` is known to be empty and has not expired."""
+        expires_at = self._keys.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._keys[key]
+            return False
+        self.skipped += 1
+        return True
+
+    def is_empty(self, key: Hashable, data: bytes, expires_at: float) -> bool:
+        """Return True if the tile is known to be empty by key or by payload digest."""
+        if self.is_empty_key(key):
+            return True
+        if self.digest(data) in self._digests:
+            self._remember_key(key, expires_at)
+            self.skipped += 1
+            return True
+        return False
+
+    def add(self, key: Hashable, data: bytes, expires_at: float) -> None:
+        """Record a tile whose decoded alpha channel is entirely zero."""
+        digest = self.digest(data)
+        self._digests[digest] = None
+        self._digests.move_to_end(digest)
+        while len(self._digests) > self.max_digests:
+            self._digests.popitem(last=False)
+        self._remember_key(key, expires_at)
+
+    def _remember_key(self, key: Hashable, expires_at: float) -> None:
+        self._keys[key] = expires_at
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"digests": len(self._digests), "tiles": len(self._keys), "skipped": self.skipped}
+
+empty_tiles = EmptyTileRegistry()
+
+class DiskCache:
+    """
+    Persistent, content-addressed cache of PNG bytes that survives restarts.
+
+    Objects are stored once per SHA-256 digest under objects/<2 hex>/<digest>.png and
+    index.json maps cache keys to {digest, size, expires, atime}. The index is kept in least
+    recently used order, so the oldest keys are evicted first when the total size exceeds the budget.
+    Methods block on disk I/O, so call them through asyncio.to_thread from the event loop.
+    """
+
+    # Persist the index after this many writes, in addition to on shutdown
+    SAVE_EVERY = 50
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(directory, "objects")
+        self.index_path = os.path.join(directory, "index.json")
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._unsaved_writes = 0
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.png")
+
+    def load(self) -> None:
+        """Load the index from disk, dropping expired entries and objects no longer referenced."""
+        os.makedirs(self.objects_dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        except (OSError, ValueError) as e:
+            logger.warning("Disk cache index unreadable, starting empty: %s", e)
+            index = {}
+
+        now = time.time()
+        with self._lock:
+            self._index = OrderedDict()
+            self._refs = {}
+            self._sizes = {}
+            self.current_bytes = 0
+            # Restore LRU order from the saved access times
+            for key, entry in sorted(index.items(), key=lambda item: item[1]["atime"]):
+                if entry["expires"] <= now or not os.path.exists(self._object_path(entry["digest"])):
+                    continue
+                self._index[key] = entry
+                self._add_ref(entry["digest"], entry["size"])
+            # Remove object files left behind by entries that were never indexed or have expired
+            for root, _, files in os.walk(self.objects_dir):
+                for name in files:
+                    if name[:-len(".png")] not in self._refs:
+                        os.remove(os.path.join(root, name))
+            self._evict_locked()
+        logger.info("Disk cache loaded: %d entries, %d bytes", len(self._index), self.current_bytes)
+
+    def save(self) -> None:
+        """Atomically write the index to disk."""
+        with self._lock:
+            snapshot = json.dumps(self._index)
+            self._unsaved_writes = 0
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.index_path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for `key`, or None on a miss or expiry."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or entry["expires"] <= time.time():
+                if entry is not None:
+                    self._remove_locked(key)
+                self.misses += 1
+                return None
+            entry["atime"] = time.time()
+            self._index.move_to_end(key)
+            path = self._object_path(entry["digest"])
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                if key in self._index:
+                    self._remove_locked(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        """Store `value` under `key` until `expires_at`, writing the object file only if it is new."""
+        if len(value) > self.max_bytes:
+            return
+        digest = hashlib.sha256(value).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        with self._lock:
+            # Reference the new object before dropping the old entry, so rewriting a key with the
+            # same content doesn't delete the object file it still needs
+            self._add_ref(digest, len(value))
+            if key in self._index:
+                self._remove_locked(key)
+            self._index[key] = {"digest": digest, "size": len(value), "expires": expires_at, "atime": time.time()}
+            self._evict_locked()
+            self._unsaved_writes += 1
+            save_now = self._unsaved_writes >= self.SAVE_EVERY
+        if save_now:
+            self.save()
+
+    def _add_ref(self, digest: str, size: int) -> None:
+        if digest not in self._refs:
+            self._refs[digest] = 0
+            self._sizes[digest] = size
+            self.current_bytes += size
+        self._refs[digest] += 1
+
+    def _remove_locked(self, key: str) -> None:
+        entry = self._index.pop(key)
+        digest = entry["digest"]
+        self._refs[digest] -= 1
+        if self._refs[digest] == 0:
+            del self._refs[digest]
+            self.current_bytes -= self._sizes.pop(digest)
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+
+    def _evict_locked(self) -> None:
+        while self.current_bytes > self.max_bytes and self._index:
+            self._remove_locked(next(iter(self._index)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current usage."""
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+# Optional persistent cache for raw upstream tiles and stitched composites
+DISK_CACHE_ENABLED = config_getbool("disk_cache", "enabled", False)
+DISK_CACHE_PATH = config_get("disk_cache", "path", "cache")
+DISK_CACHE_MB = config_getfloat("disk_cache", "max_mb", 256.0)
+disk_cache: Optional[DiskCache] = (
+    DiskCache(DISK_CACHE_PATH, int(DISK_CACHE_MB * 1024 * 1024)) if DISK_CACHE_ENABLED else None
+)
+
+async def disk_cache_get(key: str) -> Optional[bytes]:
+    """Read `key` from the disk cache without blocking the event loop. Returns None if disabled."""
+    if disk_cache is None:
+        return None
+    try:
+        return await asyncio.to_thread(disk_cache.get, key)
+    except Exception as e:
+        logger.warning("Disk cache read error for %s: %s", key, e)
+        return None
+
+async def _write_disk_cache(key: str, value: bytes, expires_at: float) -> None:
+    try:
+        await asyncio.to_thread(disk_cache.set, key, value, expires_at)
+    except Exception as e:
+        logger.warning("Disk cache write error for %s: %s", key, e)
+
+_disk_write_tasks: set = set()
+
+def disk_cache_set(key: str, value: bytes, expires_at: float) -> None:
+    """
+    Write `key` to the disk cache in the background, so responses (and requests coalesced onto
+    them) only wait for the memory cache. Does nothing if disabled.
+    """
+    if disk_cache is None:
+        return
+    task = asyncio.ensure_future(_write_disk_cache(key, value, expires_at))
+    # Keep a reference until the write finishes so the task isn't garbage collected
+    _disk_write_tasks.add(task)
+    task.add_done_callback(_disk_write_tasks.discard)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared upstream client and image executor on startup and close them on shutdown."""
+    global http_client, image_executor, image_slots
+    http_client = create_http_client()
+    # Build the recolouring lookup tables before the image workers start (forked workers inherit them)
+    build_recolour_luts()
+    get_image_executor()
+    if disk_cache is not None:
+        await asyncio.to_thread(disk_cache.load)
+    # Pre-encode the blank tiles served on every error path and for satellite requests
+    create_blank_tile(256, 256)
+    create_blank_tile(TOPSKY_IMAGE_SIZE, TOPSKY_IMAGE_SIZE)
+    prefetch_task = None
+    if PREFETCH_ENABLED and (PREFETCH_SECTORS or PREFETCH_TILES):
+        prefetch_task = asyncio.create_task(prefetch_loop())
+    try:
+        yield
+    finally:
+        if prefetch_task is not None:
+            prefetch_task.cancel()
+            try:
+                await prefetch_task
+            except asyncio.CancelledError:
+                pass
+        await http_client.aclose()
+        http_client = None
+        image_executor.shutdown(wait=False)
+        image_executor = None
+        image_slots = None
+        upstream_limiter.reset()
+        for limiter in upstream_limiters.values():
+            limiter.reset()
+        if disk_cache is not None:
+            if _disk_write_tasks:
+                await asyncio.gather(*_disk_write_tasks)
+            await asyncio.to_thread(disk_cache.save)
 
 app = FastAPI(
     title="TopSky Weather Radar Bridge",
     description="A FastAPI server that bridges TopSky/EuroScope with OpenWeatherMap radar data",
-    version=__version__
+    version=__version__,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -78,13 +1300,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Middleware to record request latency, in-flight requests and bytes served per route."""
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        # Label by route template rather than raw path to keep the number of series bounded
+        route_path = getattr(request.scope.get("route"), "path", "unmatched")
+        status = str(response.status_code) if response is not None else "500"
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, route=route_path, method=request.method, status=status)
+        if response is not None:
+            HTTP_RESPONSE_BYTES.inc(int(response.headers.get("content-length", 0)), route=route_path)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Middleware to log all incoming HTTP requests and their responses."""
-    print(f"→ {request.method} {request.url}")
-    response = await call_next(request)
-    print(f"← {response.status_code}")
-    return response
+    """
+    Middleware to assign each request a correlation ID (taken from X-Request-ID when the
+    client sends one) and log one access line per request.
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        if ACCESS_LOG:
+            logger.info(
+                "%s %s -> %d (%.1f ms)", request.method, request.url.path, response.status_code,
+                (time.perf_counter() - started) * 1000,
+                extra={"method": request.method, "path": request.url.path, "status": response.status_code},
+            )
+        return response
+    finally:
+        request_id_var.reset(token)
 
 @app.middleware("http")
 async def normalize_path_middleware(request: Request, call_next):
@@ -119,36 +1373,650 @@ def latlon_to_world_pixels(lat: float, lon: float, zoom: int) -> Tuple[float, fl
     y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n * 256
     return x, y
 
-def create_blank_tile(width: int = 256, height: int = 256) -> bytes:
+# PNG encoding profiles:
+#   fast     = RGBA, lowest zlib compression (least CPU per image)
+#   small    = palette quantized to the OWM precipitation colour ramp, optimized (least bandwidth)
+#   lossless = RGBA with Pillow's default compression (the original output)
+PNG_PROFILES = ("fast", "small", "lossless")
+
+def _png_profile_setting(option: str, fallback: str) -> str:
+    profile = config_get("png", option, fallback).strip().lower() or fallback
+    if profile not in PNG_PROFILES:
+        logger.warning("Invalid [png] %s: %r, using %s", option, profile, fallback)
+        return fallback
+    return profile
+
+PNG_PROFILE = _png_profile_setting("profile", "lossless")
+TILE_PNG_PROFILE = _png_profile_setting("tile_profile", PNG_PROFILE)
+STITCHED_PNG_PROFILE = _png_profile_setting("stitched_profile", PNG_PROFILE)
+# Serve upstream RGBA PNG tiles unchanged instead of re-encoding them with TILE_PNG_PROFILE
+PNG_PASSTHROUGH = config_getbool("png", "passthrough", True)
+# Blank tiles default to the palette encoding, which makes them only ~100 bytes
+BLANK_PNG_PROFILE = _png_profile_setting("blank_profile", "small")
+
+# OWM precipitation_new colour ramp: (mm/h, (R, G, B, alpha 0-1))
+OWM_PRECIPITATION_RAMP = [
+    (0.0, (225, 200, 100, 0.0)),
+    (0.1, (200, 150, 150, 0.0)),
+    (0.2, (150, 150, 170, 0.0)),
+    (0.5, (120, 120, 190, 0.0)),
+    (1.0, (110, 110, 205, 0.3)),
+    (10.0, (80, 80, 225, 0.7)),
+    (140.0, (20, 20, 255, 0.9)),
+]
+
+# The palette pairs PALETTE_COLOURS samples of the ramp with PALETTE_ALPHA_LEVELS alpha
+# steps, plus one fully transparent entry at index 0 (256 entries in total)
+PALETTE_COLOURS = 15
+PALETTE_ALPHA_LEVELS = 17
+PALETTE_ALPHA_STEP = 255 // PALETTE_ALPHA_LEVELS
+
+@functools.lru_cache(maxsize=1)
+def owm_precipitation_palette() -> np.ndarray:
+    """Build the 256-entry RGBA palette used by the "small" PNG profile."""
+    stops = np.log([max(mm, 0.05) for mm, _ in OWM_PRECIPITATION_RAMP])
+    colours = np.array([rgba[:3] for _, rgba in OWM_PRECIPITATION_RAMP], dtype=np.float64)
+    samples = np.linspace(stops[0], stops[-1], PALETTE_COLOURS)
+    ramp = np.stack([np.interp(samples, stops, colours[:, c]) for c in range(3)], axis=1)
+    palette = np.zeros((1 + PALETTE_COLOURS * PALETTE_ALPHA_LEVELS, 4), dtype=np.uint8)
+    palette[1:, :3] = np.repeat(np.rint(ramp), PALETTE_ALPHA_LEVELS, axis=0)
+    palette[1:, 3] = np.tile(np.arange(1, PALETTE_ALPHA_LEVELS + 1) * PALETTE_ALPHA_STEP, PALETTE_COLOURS)
+    return palette
+
+@functools.lru_cache(maxsize=1)
+def owm_colour_lut() -> np.ndarray:
     """
-    Create a fully transparent PNG tile of a given size.
-    Used as a fallback for errors or missing data.
+    Lookup table from packed RGB (4 bits per channel, 4096 entries) to the nearest ramp
+    colour, so quantizing an image is a single vectorized gather.
+    """
+    ramp = owm_precipitation_palette()[1::PALETTE_ALPHA_LEVELS, :3].astype(np.int32)
+    levels = np.arange(16, dtype=np.int32) * 17
+    r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+    packed = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+    distances = ((packed[:, None, :] - ramp[None, :, :]) ** 2).sum(axis=2)
+    return np.argmin(distances, axis=1).astype(np.uint8)
+
+def quantize_to_owm_palette(pixels: np.ndarray) -> np.ndarray:
+    """Map an RGBA array to indices into owm_precipitation_palette()."""
+    # Round each colour channel to 4 bits and pack into one 12-bit key per pixel
+    nibbles = (pixels[..., :3].astype(np.uint16) + 8) // 17
+    packed = (nibbles[..., 0] << 8) | (nibbles[..., 1] << 4) | nibbles[..., 2]
+    colour = owm_colour_lut()[packed].astype(np.uint16)
+    alpha = (pixels[..., 3].astype(np.uint16) + PALETTE_ALPHA_STEP // 2) // PALETTE_ALPHA_STEP
+    alpha = alpha.clip(0, PALETTE_ALPHA_LEVELS)
+    indices = np.where(alpha == 0, 0, 1 + colour * PALETTE_ALPHA_LEVELS + alpha - 1)
+    return indices.astype(np.uint8)
+
+# RainViewer colour schemes: (RainViewer scheme id, [(dBZ from which a colour applies, (R, G, B, A))]).
+# Below the first stop pixels become transparent. `nexrad` is the NWS reflectivity table; the
+# others approximate RainViewer's published tables closely enough for ATC weather display.
+COLOUR_SCHEMES: Dict[str, Tuple[int, List[Tuple[float, Tuple[int, int, int, int]]]]] = {
+    "black_and_white": (0, [
+        (5, (60, 60, 60, 255)), (15, (95, 95, 95, 255)), (25, (130, 130, 130, 255)), (35, (165, 165, 165, 255)),
+        (45, (200, 200, 200, 255)), (55, (235, 235, 235, 255)), (65, (255, 255, 255, 255)),
+    ]),
+    "universal_blue": (2, [
+        (10, (136, 221, 238, 255)), (20, (0, 153, 204, 255)), (25, (0, 119, 170, 255)), (30, (0, 85, 136, 255)),
+        (35, (255, 238, 0, 255)), (40, (255, 170, 0, 255)), (45, (255, 68, 0, 255)), (50, (193, 0, 0, 255)),
+        (55, (255, 170, 255, 255)), (60, (255, 68, 255, 255)), (65, (255, 255, 255, 255)),
+    ]),
+    "nexrad": (6, [
+        (5, (4, 233, 231, 255)), (10, (1, 159, 244, 255)), (15, (3, 0, 244, 255)), (20, (2, 253, 2, 255)),
+        (25, (1, 197, 1, 255)), (30, (0, 142, 0, 255)), (35, (253, 248, 2, 255)), (40, (229, 188, 0, 255)),
+        (45, (253, 149, 0, 255)), (50, (253, 0, 0, 255)), (55, (212, 0, 0, 255)), (60, (188, 0, 0, 255)),
+        (65, (248, 0, 253, 255)), (70, (152, 84, 198, 255)), (75, (253, 253, 253, 255)),
+    ]),
+}
+
+# Recolour lookup tables are indexed by packed RGB with RECOLOUR_BITS per channel (32768 entries)
+RECOLOUR_BITS = 5
+
+def precipitation_to_dbz(mm_per_hour: np.ndarray) -> np.ndarray:
+    """Radar reflectivity for a rain rate, using the Marshall-Palmer relation Z = 200 R^1.6."""
+    return 10 * np.log10(200 * np.power(mm_per_hour, 1.6))
+
+@functools.lru_cache(maxsize=1)
+def owm_intensity_lut() -> np.ndarray:
+    """
+    Lookup table from packed RGB to the reflectivity (dBZ) of the nearest colour on the
+    OWM precipitation ramp, sampled finely in log rain rate.
+    """
+    stops = np.log([max(mm, 0.05) for mm, _ in OWM_PRECIPITATION_RAMP])
+    colours = np.array([rgba[:3] for _, rgba in OWM_PRECIPITATION_RAMP], dtype=np.float64)
+    samples = np.linspace(stops[0], stops[-1], 256)
+    ramp = np.stack([np.interp(samples, stops, colours[:, c]) for c in range(3)], axis=1).astype(np.float32)
+    step = 1 << (8 - RECOLOUR_BITS)
+    levels = np.arange(1 << RECOLOUR_BITS, dtype=np.float32) * step + step / 2
+    r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+    packed = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+    nearest = np.empty(len(packed), dtype=np.intp)
+    # In chunks to keep the distance matrix small
+    for start in range(0, len(packed), 4096):
+        chunk = packed[start:start + 4096]
+        nearest[start:start + 4096] = ((chunk[:, None, :] - ramp[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    return precipitation_to_dbz(np.exp(samples))[nearest].astype(np.float32)
+
+@functools.lru_cache(maxsize=len(COLOUR_SCHEMES))
+def recolour_lut(scheme: str) -> np.ndarray:
+    """
+    Lookup table from packed RGB straight to RGBA in a RainViewer colour scheme (OWM colour ->
+    dBZ -> scheme colour). Entries are RGBA pixels packed into little-endian uint32s, so a whole
+    pixel is gathered at once.
+    """
+    _, stops = COLOUR_SCHEMES[scheme]
+    colours = np.array([(0, 0, 0, 0)] + [rgba for _, rgba in stops], dtype=np.uint8)
+    indexes = np.searchsorted([dbz for dbz, _ in stops], owm_intensity_lut(), side="right")
+    return colours[indexes].view("<u4").ravel()
+
+def build_recolour_luts() -> None:
+    """
+    Build the lookup tables of every colour scheme up front, so no request (any scheme can be
+    chosen with ?color=) pays for them. The shared intensity table takes most of the time.
+    """
+    for scheme in COLOUR_SCHEMES:
+        recolour_lut(scheme)
+
+def recolour_pixels(pixels: np.ndarray, scheme: str) -> np.ndarray:
+    """
+    Repaint an RGBA array of OWM precipitation colours in a RainViewer colour scheme with one
+    gather through recolour_lut(). OWM's alpha is kept, so soft edges and blending still work.
+    """
+    # Read each pixel as one uint32 (R in the low byte) and keep the top RECOLOUR_BITS of R, G, B
+    rgba = np.ascontiguousarray(pixels).view("<u4")[..., 0]
+    shift = 8 - RECOLOUR_BITS
+    mask = (1 << RECOLOUR_BITS) - 1
+    packed = rgba >> (16 + shift)
+    packed &= mask
+    part = rgba >> (8 + shift - RECOLOUR_BITS)
+    part &= mask << RECOLOUR_BITS
+    packed |= part
+    part = rgba << (2 * RECOLOUR_BITS - shift)
+    part &= mask << (2 * RECOLOUR_BITS)
+    packed |= part
+    recoloured = recolour_lut(scheme)[packed].view(np.uint8).reshape(pixels.shape)
+    recoloured[..., 3] = (recoloured[..., 3].astype(np.uint16) * pixels[..., 3] + 127) // 255
+    return recoloured
+
+def parse_colour_scheme(value: Optional[str], fallback: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve a colour scheme by name or RainViewer scheme id. `original` (or empty) keeps OWM's
+    colours and returns None; unknown values return `fallback`.
     """
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    value = (value or "").strip().lower()
+    if value in ("", "original"):
+        return None
+    for name, (scheme_id, _) in COLOUR_SCHEMES.items():
+        if value in (name, str(scheme_id)):
+            return name
+    logger.warning("Unknown colour scheme %r (expected original, %s)", value, ", ".join(COLOUR_SCHEMES))
+    return fallback
+
+# Colour scheme for precipitation images; None serves OWM's own colours
+COLOUR_SCHEME = parse_colour_scheme(config_get("colour", "scheme", "original"))
+
+def _encode_palette_blank(width: int, height: int) -> bytes:
+    # A 1-bit palette image whose single colour is fully transparent is the smallest valid PNG
+    img = Image.new("P", (width, height), 0)
+    img.putpalette([0, 0, 0])
     buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
+    img.save(buf, format="PNG", transparency=0, bits=1, optimize=True)
+    return buf.getvalue()
+
+def encode_png(pixels: np.ndarray, profile: str) -> bytes:
+    """Encode a height x width x 4 uint8 RGBA array as PNG using one of PNG_PROFILES."""
+    height, width = pixels.shape[:2]
+    buf = BytesIO()
+    if profile == "small":
+        if not pixels[..., 3].any():
+            return _encode_palette_blank(width, height)
+        indices = quantize_to_owm_palette(pixels)
+        palette = owm_precipitation_palette()
+        img = Image.frombytes("P", (width, height), indices.tobytes())
+        img.putpalette(palette[:, :3].ravel().tolist())
+        img.save(buf, format="PNG", transparency=palette[:, 3].tobytes(), optimize=True)
+    elif profile == "fast":
+        Image.fromarray(pixels).save(buf, format="PNG", compress_level=1)
+    else:
+        Image.fromarray(pixels).save(buf, format="PNG")
     return buf.getvalue()
 
-async def fetch_tile_async(client: httpx.AsyncClient, z: int, x: int, y: int) -> Union[bytes, None]:
-    """Asynchronously fetches a single tile from OWM."""
-    tile_url = f"https://tile.openweathermap.org/map/{TILE_LAYER}/{z}/{x}/{y}.png"
+@functools.lru_cache(maxsize=32)
+def _encode_blank_tile(width: int, height: int) -> Tuple[bytes, str]:
+    """Encode a transparent tile once per (width, height) and return its bytes and strong ETag."""
+    data = encode_png(np.zeros((height, width, 4), dtype=np.uint8), BLANK_PNG_PROFILE)
+    etag = f'"blank-{width}x{height}-{hashlib.sha256(data).hexdigest()[:16]}"'
+    return data, etag
+
+def create_blank_tile(width: int = 256, height: int = 256) -> bytes:
+    """
+    Create a fully transparent PNG tile of a given size.
+    Used as a fallback for errors or missing data. Encoded tiles are memoized per size.
+    """
+    return _encode_blank_tile(width, height)[0]
+
+def blank_tile_response(width: int = 256, height: int = 256, request: Optional[Request] = None) -> Response:
+    """
+    Return a cached transparent PNG tile as a response with a strong ETag, or a 304 when
+    `request` shows the client already has it. No freshness is given, so clients ask again.
+    """
+    data, etag = _encode_blank_tile(width, height)
+    if request is not None and etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=data, media_type="image/png", headers={"ETag": etag})
+
+def content_etag(data: bytes) -> str:
+    """Strong ETag derived from the response bytes."""
+    return f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+
+def bucket_cache_headers(bucket: int, etag: Optional[str] = None) -> Dict[str, str]:
+    """
+    Validators and freshness for an image built from radar bucket `bucket`: it was last modified
+    at the start of the bucket and stays valid until the next 10-minute update.
+    """
+    max_age = max(0, bucket + RADAR_BUCKET_SECONDS - int(time.time()))
+    headers = {
+        "Last-Modified": email.utils.formatdate(bucket, usegmt=True),
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires for GET."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def not_modified_since(request: Request, bucket: int) -> bool:
+    """True if the client's If-Modified-Since copy is from this bucket (ignored when If-None-Match is sent)."""
+    if "if-none-match" in request.headers:
+        return False
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
     try:
-        resp = await client.get(tile_url, params={"appid": OPENWEATHER_API_KEY})
-        if resp.status_code == 200:
-            return resp.content
-        # For 404s (tile doesn't exist), we'll return None and handle it as a blank tile
-        if resp.status_code == 404:
-            print(f"Tile not found (404): {tile_url}")
-            return None
-        resp.raise_for_status() # Raise for other errors like 401, 500, etc.
+        since = email.utils.parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    return since.timestamp() >= bucket
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+def bucket_response(
+    request: Request,
+    data: bytes,
+    bucket: int,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    media_type: str = "image/png",
+) -> Response:
+    """
+    Return content built from radar bucket `bucket` with ETag/Last-Modified/Cache-Control,
+    or a 304 Not Modified if the client's If-None-Match or If-Modified-Since shows it already has them.
+    """
+    cache_headers = bucket_cache_headers(bucket, etag or content_etag(data))
+    if bucket < current_bucket():
+        # Served from an earlier bucket because the refresh is slow or failing (max-age is already 0)
+        cache_headers["X-Cache-Status"] = "stale"
+    if headers:
+        cache_headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, cache_headers["ETag"]):
+            return not_modified_response(cache_headers)
+    elif not_modified_since(request, bucket):
+        return not_modified_response(cache_headers)
+    return Response(content=data, media_type=media_type, headers=cache_headers)
+
+def single_flight(
+    registry: Dict[Hashable, "asyncio.Task[Any]"], key: Hashable, factory: Callable[[], Awaitable[Any]]
+) -> Tuple["asyncio.Task[Any]", bool]:
+    """
+    Return the task running under `key` in `registry`, or start one from `factory` and keep it
+    registered until it completes. The flag is True when an existing task was joined.
+    """
+    task = registry.get(key)
+    if task is not None:
+        return task, True
+    task = asyncio.ensure_future(factory())
+    registry[key] = task
+    task.add_done_callback(functools.partial(_finish_single_flight, registry, key))
+    return task, False
+
+def _finish_single_flight(registry: Dict[Hashable, "asyncio.Task[Any]"], key: Hashable, task: "asyncio.Task[Any]") -> None:
+    """Forget a completed task and mark its exception as retrieved, even if every waiter went away."""
+    if registry.get(key) is task:
+        del registry[key]
+    if not task.cancelled():
+        task.exception()
+
+# Upstream fetches currently in progress, keyed by (tile cache key, bucket). Concurrent callers
+# for the same tile await the same task instead of each sending their own request.
+inflight_fetches: Dict[Hashable, "asyncio.Task[Optional[bytes]]"] = {}
+coalesced_fetches = 0
+
+async def fetch_tile_upstream(
+    layer: str, z: int, x: int, y: int, cache_key: Hashable, expires_at: float
+) -> Optional[bytes]:
+    """
+    Load a single tile from the disk cache or OWM and store it in the tile caches.
+    Returns None for 404s (tile doesn't exist) and raises for any other failure.
+    """
+    disk_key = "tile/" + "/".join(str(part) for part in cache_key)
+    cached = await disk_cache_get(disk_key)
+    if cached is not None:
+        get_tile_cache(layer).set(cache_key, cached, expires_at)
+        return cached
+
+    tile_url = f"{UPSTREAM_URL}/{layer}/{z}/{x}/{y}.png"
+    breaker = get_circuit_breaker(UPSTREAM_HOST, layer)
+    with trace_span("owm.fetch", layer=layer, tile=f"{z}/{x}/{y}") as span:
+        # Check before queueing too, so requests don't wait for the limiter only to be rejected
+        if breaker is not None and breaker.rejecting():
+            raise circuit_open_error(breaker, layer)
+        # Layer share first, so requests queued behind their own layer don't hold global slots
+        async with get_upstream_limiter(layer), upstream_limiter:
+            allowed, probe = breaker.allow() if breaker is not None else (True, False)
+            if not allowed:
+                raise circuit_open_error(breaker, layer)
+            started = time.perf_counter()
+            if span is not None:
+                span.attributes["queue_ms"] = round(span.duration_ms, 3)
+            ok = None
+            try:
+                # Connection-level events (connect incl. DNS, TLS, send, receive) become child spans
+                extensions = {"trace": trace_httpx_event} if span is not None else None
+                resp = await get_http_client().get(
+                    tile_url, params={"appid": OPENWEATHER_API_KEY}, extensions=extensions
+                )
+                ok = not is_upstream_failure(resp.status_code)
+            except Exception:
+                ok = False
+                UPSTREAM_RESPONSES.inc(layer=layer, status="error")
+                raise
+            finally:
+                duration = time.perf_counter() - started
+                UPSTREAM_REQUEST_DURATION.observe(duration, layer=layer)
+                if breaker is not None:
+                    breaker.record(ok, duration, probe)
+        if span is not None:
+            span.attributes["status"] = resp.status_code
+            span.attributes["http_version"] = resp.http_version
+    UPSTREAM_RESPONSES.inc(layer=layer, status=str(resp.status_code))
+    if resp.status_code == 200:
+        get_tile_cache(layer).set(cache_key, resp.content, expires_at)
+        disk_cache_set(disk_key, resp.content, expires_at)
         return resp.content
-    except httpx.RequestError as e:
-        print(f"HTTP error fetching tile {z}/{x}/{y}: {e}")
+    # For 404s (tile doesn't exist), we'll return None and handle it as a blank tile
+    if resp.status_code == 404:
+        logger.debug("Tile not found (404): %s/%d/%d/%d", layer, z, x, y)
         return None
+    if not resp.is_success:
+        # Raise for other errors like 401, 500, etc., keeping the API key out of the message
+        raise httpx.HTTPStatusError(
+            f"HTTP {resp.status_code} from {redacted_url(resp.request.url)}", request=resp.request, response=resp
+        )
+    return resp.content
+
+def redacted_url(url: httpx.URL) -> httpx.URL:
+    """`url` without the API key, for log and error messages."""
+    return url.copy_remove_param("appid")
+
+def circuit_open_error(breaker: CircuitBreaker, layer: str) -> CircuitOpenError:
+    UPSTREAM_RESPONSES.inc(layer=layer, status="circuit_open")
+    return CircuitOpenError(f"Upstream circuit {breaker.name} is open")
+
+async def await_refresh(task: "asyncio.Future[Any]", have_stale: bool) -> Any:
+    """
+    Wait for a shared fetch/refresh task. Shielded, so one cancelled caller doesn't cancel it for
+    the others. With a stale copy to fall back on, raise asyncio.TimeoutError after
+    CACHE_REVALIDATE_TIMEOUT; the task keeps running and refreshes the cache in the background.
+    """
+    if not have_stale:
+        return await asyncio.shield(task)
+    return await asyncio.wait_for(asyncio.shield(task), CACHE_REVALIDATE_TIMEOUT)
+
+async def fetch_tile_async(z: int, x: int, y: int, layer: str = TILE_LAYER) -> Union[bytes, None]:
+    """
+    Asynchronously fetches a single tile from OWM using the shared client.
+    Tiles are served from the in-memory tile cache when fetched earlier in the same radar bucket,
+    and concurrent requests for the same tile share a single upstream fetch and its outcome.
+    """
+    return (await fetch_tile_entry(z, x, y, layer))[0]
+
+async def fetch_tile_entry(z: int, x: int, y: int, layer: str = TILE_LAYER) -> Tuple[Optional[bytes], Optional[int]]:
+    """
+    Like fetch_tile_async, but also return the radar bucket the bytes belong to. If OWM is slow
+    or failing and an earlier bucket's copy is still within the staleness window, that copy is
+    returned (with its older bucket) while the fetch carries on in the background.
+    The bucket is None when the fetch failed and there was nothing to fall back on.
+    """
+    with trace_span("tile", layer=layer, tile=f"{z}/{x}/{y}") as span:
+        return await _fetch_tile(layer, z, x, y, span)
+
+async def _fetch_tile(
+    layer: str, z: int, x: int, y: int, span: Optional[Span]
+) -> Tuple[Optional[bytes], Optional[int]]:
+    global coalesced_fetches
+    bucket = current_bucket()
+    cache_key = tile_cache_key(layer, z, x, y)
+    tile_cache = get_tile_cache(layer)
+    cached = tile_cache.get(cache_key)
+    if cached is not None:
+        if span is not None:
+            span.attributes["source"] = "cache"
+        return cached, bucket
+    stale = tile_cache.get_stale(cache_key)
+
+    task, joined = single_flight(
+        inflight_fetches, (cache_key, bucket),
+        lambda: fetch_tile_upstream(layer, z, x, y, cache_key, bucket + RADAR_BUCKET_SECONDS),
+    )
+    if joined:
+        coalesced_fetches += 1
+        source = "coalesced"
+    else:
+        source = "upstream"
+    if span is not None:
+        span.attributes["source"] = source
+
+    try:
+        return await await_refresh(task, stale is not None), bucket
+    except asyncio.TimeoutError:
+        logger.debug("Tile %s/%d/%d/%d still refreshing, serving stale copy", layer, z, x, y)
+    except CircuitOpenError as e:
+        logger.debug("Skipping tile %s/%d/%d/%d: %s", layer, z, x, y, e)
+    except httpx.RequestError as e:
+        logger.warning("HTTP error fetching tile %s/%d/%d/%d from %s: %r", layer, z, x, y, redacted_url(e.request.url), e)
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        print(f"Generic error fetching tile {z}/{x}/{y}: {e}")
-        return None
+        logger.warning("Generic error fetching tile %s/%d/%d/%d: %s", layer, z, x, y, e)
+    if stale is None:
+        return None, None
+    STALE_SERVED.inc(cache="tile")
+    if span is not None:
+        span.attributes["source"] = "stale"
+    value, expires_at = stale
+    return value, int(expires_at) - RADAR_BUCKET_SECONDS
+
+def stitch_tiles(
+    placements: List[Tuple[int, int, Optional[bytes]]], width: int, height: int,
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, List[int]]:
+    """
+    Decode PNG tiles into one preallocated height x width x 4 uint8 RGBA canvas.
+    Each placement is (paste_x, paste_y, tile_data); tiles partly outside the canvas are
+    clipped, and missing tiles leave their area transparent.
+    Returns the canvas and the indexes of placements whose tiles were fully transparent.
+    If `timings` is given, seconds spent decoding and stitching are added to it.
+    """
+    started = time.perf_counter()
+    decode_time = 0.0
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+    empty_indexes = []
+    for index, (paste_x, paste_y, tile_data) in enumerate(placements):
+        if not tile_data:
+            continue
+        decode_started = time.perf_counter()
+        try:
+            tile_image = Image.open(BytesIO(tile_data))
+            # OWM tiles are already RGBA, so this normally decodes without a conversion copy
+            if tile_image.mode != "RGBA":
+                tile_image = tile_image.convert("RGBA")
+            tile = np.asarray(tile_image)
+        except Exception as e:
+            logger.warning("Error processing tile at (%d, %d): %s", paste_x, paste_y, e)
+            continue
+        finally:
+            decode_time += time.perf_counter() - decode_started
+        # Viewed as little-endian uint32 pixels, any alpha above 0 makes the value exceed 0x00FFFFFF
+        if not (tile.view("<u4") > 0x00FFFFFF).any():
+            empty_indexes.append(index)
+            continue
+        tile_height, tile_width = tile.shape[:2]
+        # Clip the tile to the canvas: dst is where it lands, src the part of the tile that fits
+        dst_x0, dst_y0 = max(paste_x, 0), max(paste_y, 0)
+        dst_x1, dst_y1 = min(paste_x + tile_width, width), min(paste_y + tile_height, height)
+        if dst_x0 < dst_x1 and dst_y0 < dst_y1:
+            canvas[dst_y0:dst_y1, dst_x0:dst_x1] = tile[dst_y0 - paste_y:dst_y1 - paste_y, dst_x0 - paste_x:dst_x1 - paste_x]
+    if timings is not None:
+        timings["decode"] = timings.get("decode", 0.0) + decode_time
+        timings["stitch"] = timings.get("stitch", 0.0) + time.perf_counter() - started - decode_time
+    return canvas, empty_indexes
+
+# Added to the TopSky zoom level so stitched images are built from higher-resolution tiles
+STITCH_ZOOM_OFFSET = 1
+
+def composite_over(canvases: List[np.ndarray], opacities: List[float], band_rows: int = 256) -> np.ndarray:
+    """
+    Blend bottom-to-top RGBA canvases with Porter-Duff "over", scaling each layer's alpha by its
+    opacity. The whole layer stack is combined in one vectorized pass: each layer is weighted by
+    its alpha times the transparency of everything above it. Rows are processed in bands to
+    bound the float32 working memory on large images.
+    """
+    stack = np.stack(canvases)
+    height, width = stack.shape[1:3]
+    opacity = np.asarray(opacities, dtype=np.float32).reshape(-1, 1, 1)
+    out = np.empty((height, width, 4), dtype=np.uint8)
+    for y0 in range(0, height, band_rows):
+        band = stack[:, y0:y0 + band_rows].astype(np.float32)
+        alpha = band[..., 3] * (opacity / 255)
+        # clear_from[i] = product of (1 - alpha) for layer i and every layer above it
+        clear_from = np.cumprod((1 - alpha)[::-1], axis=0)[::-1]
+        visible = np.concatenate([clear_from[1:], np.ones_like(clear_from[:1])])
+        weight = alpha * visible
+        out_alpha = 1 - clear_from[0]
+        rgb = (weight[..., None] * band[..., :3]).sum(axis=0) / np.maximum(out_alpha, 1e-6)[..., None]
+        out[y0:y0 + band_rows, :, :3] = np.clip(np.rint(rgb), 0, 255)
+        out[y0:y0 + band_rows, :, 3] = np.rint(out_alpha * 255)
+    return out
+
+def render_stitched_png(
+    layers: List[Tuple[List[Tuple[int, int, Optional[bytes]]], float]], width: int, height: int, profile: str,
+    colour_schemes: Optional[List[Optional[str]]] = None,
+) -> Tuple[bytes, List[List[int]], Dict[str, float]]:
+    """
+    Stitch the placed tiles of each layer, repaint layers that have a colour scheme, blend the
+    layers bottom to top with their opacity and encode the composite as PNG. Runs on the image
+    executor. Returns the PNG bytes, the indexes of each layer's placements that turned out to be
+    fully transparent, and the seconds spent in the decode, stitch, recolour and blend (only when
+    needed) and encode stages.
+    """
+    timings: Dict[str, float] = {}
+    canvases = []
+    empty_indexes = []
+    for index, (placements, _) in enumerate(layers):
+        canvas, layer_empty_indexes = stitch_tiles(placements, width, height, timings)
+        scheme = colour_schemes[index] if colour_schemes else None
+        if scheme is not None:
+            started = time.perf_counter()
+            canvas = recolour_pixels(canvas, scheme)
+            timings["recolour"] = timings.get("recolour", 0.0) + time.perf_counter() - started
+        canvases.append(canvas)
+        empty_indexes.append(layer_empty_indexes)
+    if len(layers) == 1 and layers[0][1] >= 1.0:
+        canvas = canvases[0]
+    else:
+        started = time.perf_counter()
+        canvas = composite_over(canvases, [opacity for _, opacity in layers])
+        timings["blend"] = time.perf_counter() - started
+    started = time.perf_counter()
+    image_bytes = encode_png(canvas, profile)
+    timings["encode"] = time.perf_counter() - started
+    return image_bytes, empty_indexes, timings
+
+# Bottom-to-top (layer, opacity) pairs that make up a stitched image
+LayerStack = Tuple[Tuple[str, float], ...]
+
+def parse_layer_stack(value: str) -> LayerStack:
+    """
+    Parse "layer[:opacity], ..." (bottom layer first, opacity 0-1 defaulting to 1) into a layer
+    stack. Each layer may appear once, which also bounds the stack (and the canvases blended for
+    it) at len(OWM_LAYERS). Raises ValueError for unknown or repeated layers and invalid opacities.
+    """
+    entries = [entry.strip() for entry in value.split(",") if entry.strip()]
+    if len(entries) > len(OWM_LAYERS):
+        raise ValueError(f"{len(entries)} layers given, at most {len(OWM_LAYERS)} allowed")
+    layers = []
+    for entry in entries:
+        name, _, opacity_text = entry.partition(":")
+        name = name.strip()
+        if name not in OWM_LAYERS:
+            raise ValueError(f"unknown layer {name[:32]!r}, expected one of {', '.join(OWM_LAYERS)}")
+        if any(name == existing for existing, _ in layers):
+            raise ValueError(f"layer {name!r} given more than once")
+        try:
+            opacity = min(1.0, max(0.0, float(opacity_text))) if opacity_text.strip() else 1.0
+        except ValueError:
+            raise ValueError(f"invalid opacity for layer {name!r}") from None
+        layers.append((name, opacity))
+    return tuple(layers)
+
+def format_layer_stack(layers: LayerStack) -> str:
+    """Compact, stable name for a layer stack, used in cache keys: "clouds_new@0.5+precipitation_new"."""
+    return "+".join(name if opacity >= 1.0 else f"{name}@{opacity:g}" for name, opacity in layers)
+
+# Layers blended into stitched TopSky images; by default just TILE_LAYER
+def _composite_layers_setting() -> LayerStack:
+    value = config_get("composite", "layers", "")
+    try:
+        return parse_layer_stack(value) or ((TILE_LAYER, 1.0),)
+    except ValueError as e:
+        logger.warning("Invalid [composite] layers: %s, using %s", e, TILE_LAYER)
+        return ((TILE_LAYER, 1.0),)
+
+COMPOSITE_LAYERS = _composite_layers_setting()
+
+def png_profile_for_layers(profile: str, layer_names: Iterable[str], colour_scheme: Optional[str] = None) -> str:
+    """
+    The `small` profile quantizes to OWM precipitation colours, so other layers and recoloured
+    images are kept lossless.
+    """
+    if profile == "small" and (colour_scheme is not None or any(name != "precipitation_new" for name in layer_names)):
+        return "lossless"
+    return profile
+
+def stitched_png_profile(layers: LayerStack, colour_scheme: Optional[str] = None) -> str:
+    return png_profile_for_layers(STITCHED_PNG_PROFILE, (name for name, _ in layers), colour_scheme)
+
+def layer_colour_scheme(layer: str, colour_scheme: Optional[str]) -> Optional[str]:
+    """Colour schemes map precipitation intensity, so only the precipitation layer is recoloured."""
+    return colour_scheme if layer == "precipitation_new" else None
+
+# Stitched composites currently being built, keyed by (stitched cache key, bucket)
+inflight_stitches: Dict[Hashable, "asyncio.Task[Tuple[bytes, Optional[int]]]"] = {}
 
 async def create_stitched_tile(
     zoom: int,
@@ -156,17 +2024,76 @@ async def create_stitched_tile(
     center_lon: float,
     width: int,
     height: int,
-) -> bytes:
+    layers: Optional[LayerStack] = None,
+    colour_scheme: Optional[str] = COLOUR_SCHEME,
+) -> Tuple[bytes, Optional[int]]:
     """
     Creates a large, high-resolution composite tile by fetching and stitching multiple OWM tiles.
+    `layers` (default COMPOSITE_LAYERS) are fetched together and blended bottom to top, with
+    precipitation repainted in `colour_scheme` (None keeps OWM's colours).
+    Finished composites are cached in memory (and on disk when enabled) until the next radar bucket.
+    Returns the PNG bytes and the radar bucket they show, which is older than the current one
+    when a stale composite is served because rebuilding it is slow or failing, or None when
+    some tiles could not be fetched and the image is incomplete (and not cached).
     """
-    print(
-        f"Creating stitched tile: zoom={zoom}, center=({center_lat}, {center_lon}), "
-        f"size=({width}x{height})"
+    logger.debug(
+        "Creating stitched tile: zoom=%d, center=(%s, %s), size=(%dx%d)",
+        zoom, center_lat, center_lon, width, height,
     )
-    # 1. Find the pixel coordinates of the center point in the world map
+    # 1. Find the pixel coordinates of the center point in the world map, snapped to the
+    # output pixel grid so tiny float differences in the requested centre share a cache entry
     center_px_x, center_px_y = latlon_to_world_pixels(center_lat, center_lon, zoom)
+    center_px_x, center_px_y = round(center_px_x), round(center_px_y)
+
+    layers = layers or COMPOSITE_LAYERS
+    colour_schemes = [layer_colour_scheme(name, colour_scheme) for name, _ in layers]
+    if not any(colour_schemes):
+        colour_scheme = None
+    profile = stitched_png_profile(layers, colour_scheme)
+    bucket = current_bucket()
+    cache_key = (
+        format_layer_stack(layers), width, height, zoom, center_px_x, center_px_y, profile, colour_scheme or "original"
+    )
+    disk_key = "stitched/" + "/".join(str(part) for part in cache_key)
+    with trace_span("cache") as span:
+        cached = stitched_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Serving stitched tile from memory cache")
+            if span is not None:
+                span.attributes["result"] = "memory"
+            return cached, bucket
+        cached = await disk_cache_get(disk_key)
+        if span is not None:
+            span.attributes["result"] = "disk" if cached is not None else "miss"
+    if cached is not None:
+        logger.debug("Serving stitched tile from disk cache")
+        stitched_cache.set(cache_key, cached, bucket + RADAR_BUCKET_SECONDS)
+        return cached, bucket
+    stale = stitched_cache.get_stale(cache_key)
 
+    # Build the composite once, however many requests (or prefetches) ask for it meanwhile
+    task, _ = single_flight(inflight_stitches, (cache_key, bucket), lambda: build_stitched_tile(
+        cache_key, disk_key, bucket, layers, profile, colour_schemes, zoom, center_px_x, center_px_y, width, height
+    ))
+    try:
+        return await await_refresh(task, stale is not None)
+    except asyncio.TimeoutError:
+        logger.debug("Stitched tile still rebuilding, serving stale copy")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        if stale is None:
+            raise
+        logger.warning("Error rebuilding stitched tile, serving stale copy: %s", e)
+    STALE_SERVED.inc(cache="stitched")
+    value, expires_at = stale
+    return value, int(expires_at) - RADAR_BUCKET_SECONDS
+
+async def build_stitched_tile(
+    cache_key: Hashable, disk_key: str, bucket: int, layers: LayerStack, profile: str,
+    colour_schemes: List[Optional[str]], zoom: int, center_px_x: int, center_px_y: int, width: int, height: int,
+) -> Tuple[bytes, Optional[int]]:
+    """Fetch, stitch and encode a composite centred on world pixel (center_px_x, center_px_y), then cache it."""
     # 2. Determine the top-left corner of our composite image in world pixels
     top_left_px_x = center_px_x - width / 2
     top_left_px_y = center_px_y - height / 2
@@ -177,87 +2104,275 @@ async def create_stitched_tile(
     start_tile_y = math.floor(top_left_px_y / 256)
     end_tile_y = math.ceil((top_left_px_y + height) / 256)
     
-    print(f"Tile grid to fetch: x=[{start_tile_x}...{end_tile_x}], y=[{start_tile_y}...{end_tile_y}]")
+    logger.debug("Tile grid to fetch: x=[%d...%d], y=[%d...%d]", start_tile_x, end_tile_x, start_tile_y, end_tile_y)
 
-    # 4. Fetch all required tiles asynchronously
+    # 4. Fetch all required tiles of every layer concurrently, skipping tiles known to be empty
+    expires_at = bucket + RADAR_BUCKET_SECONDS
     tasks = []
-    tile_coords = []
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    tile_refs = []
+    for layer_index, (layer, _) in enumerate(layers):
         for y in range(start_tile_y, end_tile_y + 1):
             for x in range(start_tile_x, end_tile_x + 1):
-                tasks.append(fetch_tile_async(client, zoom, x, y))
-                tile_coords.append((x, y))
-        
+                if empty_tiles.is_empty_key(tile_cache_key(layer, zoom, x, y)):
+                    continue
+                tasks.append(fetch_tile_entry(zoom, x, y, layer))
+                tile_refs.append((layer_index, x, y))
+
+    fetch_started = time.perf_counter()
+    with trace_span("fetch", tiles=len(tasks), layers=format_layer_stack(layers)):
         fetched_tiles_data = await asyncio.gather(*tasks)
+    STITCH_STAGE_DURATION.observe(time.perf_counter() - fetch_started, stage="fetch")
 
-    # 5. Create the composite image and paste the fetched tiles
-    composite_image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    
-    for i, tile_data in enumerate(fetched_tiles_data):
-        if tile_data:
-            try:
-                tile_image = Image.open(BytesIO(tile_data)).convert("RGBA")
-                tile_x, tile_y = tile_coords[i]
+    # 5. Decode the fetched tiles into per-layer canvases, blend and encode on the image executor
+    # The composite is only as recent as its oldest tile, and incomplete if any tile failed
+    tile_buckets = [tile_bucket for _, tile_bucket in fetched_tiles_data]
+    incomplete = None in tile_buckets
+    data_bucket = min((tile_bucket for tile_bucket in tile_buckets if tile_bucket is not None), default=bucket)
+    layer_placements: List[Tuple[List[Tuple[int, int, Optional[bytes]]], float]] = [([], opacity) for _, opacity in layers]
+    placement_keys: List[List[Hashable]] = [[] for _ in layers]
+    for (layer_index, tile_x, tile_y), (tile_data, tile_bucket) in zip(tile_refs, fetched_tiles_data):
+        key = tile_cache_key(layers[layer_index][0], zoom, tile_x, tile_y)
+        if not tile_data or empty_tiles.is_empty(key, tile_data, tile_bucket + RADAR_BUCKET_SECONDS):
+            continue
+        # Calculate the paste position on the composite image
+        paste_x = round(tile_x * 256 - top_left_px_x)
+        paste_y = round(tile_y * 256 - top_left_px_y)
+        layer_placements[layer_index][0].append((paste_x, paste_y, tile_data))
+        placement_keys[layer_index].append(key)
+    # Layers without any data (or fully transparent) don't change the blend
+    layer_placements_used = [(index, entry) for index, entry in enumerate(layer_placements) if entry[0] and entry[1] > 0]
+    placement_count = sum(len(placements) for _, (placements, _) in layer_placements_used)
 
-                # Calculate the paste position on the composite image
-                paste_x = round(tile_x * 256 - top_left_px_x)
-                paste_y = round(tile_y * 256 - top_left_px_y)
+    if layer_placements_used:
+        with trace_span("render", tiles=placement_count) as span:
+            image_bytes, empty_indexes, timings = await run_image_work(
+                render_stitched_png, [entry for _, entry in layer_placements_used], width, height, profile,
+                [colour_schemes[index] for index, _ in layer_placements_used],
+            )
+        stage_start_ns = span.start_ns if span is not None else 0
+        for stage in ("decode", "stitch", "recolour", "blend", "encode"):
+            if stage not in timings:
+                continue
+            seconds = timings[stage]
+            STITCH_STAGE_DURATION.observe(seconds, stage=stage)
+            # Worker stages are timed in the worker, so lay them out back to back inside the render span
+            if span is not None:
+                record_span(stage, stage_start_ns, stage_start_ns + int(seconds * 1e9), parent=span)
+                stage_start_ns += int(seconds * 1e9)
+        for (layer_index, (placements, _)), layer_empty_indexes in zip(layer_placements_used, empty_indexes):
+            for index in layer_empty_indexes:
+                empty_tiles.add(placement_keys[layer_index][index], placements[index][2], data_bucket + RADAR_BUCKET_SECONDS)
+        if sum(len(indexes) for indexes in empty_indexes) == placement_count:
+            image_bytes = create_blank_tile(width, height)
+    else:
+        # No weather data anywhere in the image, so skip all image work
+        logger.debug("No radar data in stitched area, serving blank tile")
+        image_bytes = create_blank_tile(width, height)
 
-                composite_image.paste(tile_image, (paste_x, paste_y))
-            except Exception as e:
-                print(f"Error processing tile {tile_coords[i]}: {e}")
+    # 6. Cache and return the final image bytes. A composite built from stale tiles is cached
+    # as already expired, so it only serves as a stale fallback until a fresh one is built.
+    if incomplete:
+        return image_bytes, None
+    if data_bucket < bucket:
+        stitched_cache.set(cache_key, image_bytes, data_bucket + RADAR_BUCKET_SECONDS)
+    else:
+        stitched_cache.set(cache_key, image_bytes, expires_at)
+        disk_cache_set(disk_key, image_bytes, expires_at)
+    return image_bytes, data_bucket
 
-    # 6. Return the final image as bytes
-    buf = BytesIO()
-    composite_image.save(buf, format="PNG")
-    buf.seek(0)
-    return buf.getvalue()
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def is_passthrough_png(data: bytes) -> bool:
+    """
+    Check from the header alone whether upstream bytes are an 8-bit RGBA PNG that can be
+    served unchanged: the PNG signature, followed by an IHDR chunk with colour type 6.
+    """
+    return (
+        len(data) >= 33
+        and data[:8] == PNG_SIGNATURE
+        and data[12:16] == b"IHDR"
+        and data[24] == 8  # bit depth
+        and data[25] == 6  # colour type: truecolour with alpha
+    )
+
+def convert_tile_to_png(tile_data: bytes, profile: str, colour_scheme: Optional[str] = None) -> Optional[bytes]:
+    """
+    Decode an upstream tile and re-encode it as PNG for maximum compatibility, repainted in
+    `colour_scheme` if given. Returns None if the tile is fully transparent, so the cached blank
+    tile can be served instead.
+    """
+    img = Image.open(BytesIO(tile_data))
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    pixels = np.asarray(img)
+    if not pixels[..., 3].any():
+        return None
+    if colour_scheme is not None:
+        pixels = recolour_pixels(pixels, colour_scheme)
+    return encode_png(pixels, profile)
+
+def empty_tile_response(request: Request, bucket: int) -> Response:
+    """A blank tile standing in for a tile OWM reported as having no precipitation this bucket."""
+    data, etag = _encode_blank_tile(256, 256)
+    return bucket_response(request, data, bucket, etag)
 
-def fetch_and_return_tile(z: int, x: int, y: int) -> bytes:
+async def fetch_and_return_tile(
+    request: Request, z: int, x: int, y: int, layer: str = TILE_LAYER, colour_scheme: Optional[str] = COLOUR_SCHEME
+) -> Response:
     """
-    Fetch a weather tile from OpenWeatherMap and return it as PNG bytes.
-    If fetching or processing fails, return a blank tile.
+    Fetch a weather tile of `layer` from OpenWeatherMap and return it as a PNG response with cache
+    validators, with precipitation repainted in `colour_scheme` (None keeps OWM's colours).
+    If fetching or processing fails, return a blank tile that clients will request again.
     """
-    tile_url = f"https://tile.openweathermap.org/map/{TILE_LAYER}/{z}/{x}/{y}.png"
-    print(f"Fetching OWM tile: {tile_url}")
+    colour_scheme = layer_colour_scheme(layer, colour_scheme)
+    bucket = current_bucket()
+    if not_modified_since(request, bucket):
+        # The client already has this bucket's tile, so skip fetching and encoding entirely
+        return not_modified_response(bucket_cache_headers(bucket))
+    logger.debug("Fetching OWM tile: %s/%d/%d/%d", layer, z, x, y)
+    tile_data, bucket = await fetch_tile_entry(z, x, y, layer)
+    if not tile_data:
+        logger.debug("Returning blank tile, upstream tile unavailable")
+        return blank_tile_response(request=request)
+    logger.debug("OWM tile fetched successfully: %d bytes", len(tile_data))
+    key = tile_cache_key(layer, z, x, y)
+    if empty_tiles.is_empty(key, tile_data, bucket + RADAR_BUCKET_SECONDS):
+        return empty_tile_response(request, bucket)
+    if PNG_PASSTHROUGH and colour_scheme is None and is_passthrough_png(tile_data):
+        # OWM already returns RGBA PNGs, so serve the original bytes without decoding
+        return bucket_response(request, tile_data, bucket)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            # Fetch the tile from OWM with API key
-            resp = client.get(tile_url, params={"appid": OPENWEATHER_API_KEY})
-            resp.raise_for_status()
-            print(f"OWM tile fetched successfully: {len(resp.content)} bytes")
-            # Convert to RGBA to ensure compatibility
-            img = Image.open(BytesIO(resp.content)).convert("RGBA")
-            buf = BytesIO()
-            img.save(buf, format="PNG")
-            buf.seek(0)
-            return buf.getvalue()
+        # Convert to RGBA off the event loop
+        profile = png_profile_for_layers(TILE_PNG_PROFILE, [layer], colour_scheme)
+        png_bytes = await run_image_work(convert_tile_to_png, tile_data, profile, colour_scheme)
+        if png_bytes is None:
+            empty_tiles.add(key, tile_data, bucket + RADAR_BUCKET_SECONDS)
+            return empty_tile_response(request, bucket)
+        return bucket_response(request, png_bytes, bucket)
     except Exception as e:
-        print(f"Tile fetch/process error: {e}")
-        print("Returning blank tile due to error")
-        return create_blank_tile()
+        logger.warning("Tile process error, returning blank tile: %s", e)
+        return blank_tile_response(request=request)
+
+def parse_prefetch_sectors(value: str) -> List[Tuple[float, float, int, int]]:
+    """Parse "lat,lon,size,zoom; ..." into sector tuples, skipping invalid entries."""
+    sectors = []
+    for entry in value.split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            lat, lon, size, zoom = (part.strip() for part in entry.split(","))
+            sectors.append((float(lat), float(lon), int(size), int(zoom)))
+        except ValueError:
+            logger.warning("Ignoring invalid prefetch sector: %r (expected lat,lon,size,zoom)", entry)
+    return sectors
+
+def parse_prefetch_tiles(value: str) -> List[Tuple[int, int, int, int, int]]:
+    """Parse "zoom:min_x-max_x:min_y-max_y; ..." into tile bounding boxes, skipping invalid entries."""
+    boxes = []
+    for entry in value.split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            zoom, x_range, y_range = entry.split(":")
+            min_x, max_x = (int(v) for v in x_range.split("-"))
+            min_y, max_y = (int(v) for v in y_range.split("-"))
+            boxes.append((int(zoom), min_x, max_x, min_y, max_y))
+        except ValueError:
+            logger.warning("Ignoring invalid prefetch tile box: %r (expected zoom:min_x-max_x:min_y-max_y)", entry)
+    return boxes
+
+# Background prefetching of configured areas just after each radar bucket boundary,
+# so TopSky clients find the new frame already in the caches
+PREFETCH_ENABLED = config_getbool("prefetch", "enabled", False)
+PREFETCH_SECTORS = parse_prefetch_sectors(config_get("prefetch", "sectors", ""))
+PREFETCH_TILES = parse_prefetch_tiles(config_get("prefetch", "tiles", ""))
+PREFETCH_DELAY = max(0.0, config_getfloat("prefetch", "delay", 15.0))
+PREFETCH_CONCURRENCY = max(1, config_getint("prefetch", "concurrency", 4))
+prefetch_stats: Dict[str, Any] = {"runs": 0, "last_run": None, "last_duration": None, "last_errors": 0}
 
-def generate_timestamps() -> Dict[str, Any]:
+async def prefetch_once() -> None:
+    """Fetch and stitch every configured sector and tile box, a few at a time."""
+    limit = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+    errors = 0
+
+    async def run(job, description: str) -> None:
+        nonlocal errors
+        async with limit:
+            try:
+                await job()
+            except Exception as e:
+                errors += 1
+                logger.warning("Prefetch of %s failed: %s", description, e)
+
+    jobs = []
+    for lat, lon, size, zoom in PREFETCH_SECTORS:
+        # Sector zoom is the TopSky WXR_Zoom, offset the same way as the stitched endpoint
+        job = functools.partial(create_stitched_tile, zoom + STITCH_ZOOM_OFFSET, lat, lon, size, size)
+        jobs.append(run(job, f"sector {lat},{lon} size={size} zoom={zoom}"))
+    for zoom, min_x, max_x, min_y, max_y in PREFETCH_TILES:
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                jobs.append(run(functools.partial(fetch_tile_async, zoom, x, y), f"tile {zoom}/{x}/{y}"))
+
+    started = time.time()
+    await asyncio.gather(*jobs)
+    prefetch_stats["runs"] += 1
+    prefetch_stats["last_run"] = int(started)
+    prefetch_stats["last_duration"] = round(time.time() - started, 3)
+    prefetch_stats["last_errors"] = errors
+    logger.info("Prefetch finished: %d jobs in %ss, %d errors", len(jobs), prefetch_stats["last_duration"], errors)
+
+async def prefetch_loop() -> None:
+    """Warm the caches at startup and then shortly after every radar bucket boundary."""
+    while True:
+        try:
+            await prefetch_once()
+        except Exception as e:
+            logger.exception("Prefetch run failed: %s", e)
+        next_run = current_bucket() + RADAR_BUCKET_SECONDS + PREFETCH_DELAY
+        await asyncio.sleep(max(0.0, next_run - time.time()))
+
+def frame_id(kind: str, t: int) -> str:
+    """Stable opaque id for a nowcast/satellite frame, so its tile URLs stay the same all bucket."""
+    return hashlib.blake2b(f"{kind}/{t}".encode(), digest_size=6).hexdigest()
+
+def generate_timestamps(bucket: Optional[int] = None, radar_path: str = "radar") -> Dict[str, Any]:
     """
     Generate RainViewer-compatible timestamp data for radar and satellite layers.
-    Returns a dict with 'radar' and 'satellite' keys.
+    Returns a dict with 'radar' and 'satellite' keys. Paths depend only on the bucket, and radar
+    frames point at /v2/{radar_path}/..., so a layer's frames can be served by its own routes.
     """
-    now = int(time.time())
-    now = (now // 600) * 600  # Round to nearest 10 minutes
+    now = current_bucket() if bucket is None else bucket
     past = []
     for i in range(3, -1, -1):
-        t = now - i * 600
-        past.append({"time": t, "path": f"/v2/radar/{t}"})
+        t = now - i * RADAR_BUCKET_SECONDS
+        past.append({"time": t, "path": f"/v2/{radar_path}/{t}"})
     nowcast = []
     for i in range(1, 3):
-        t = now + i * 600
-        nowcast.append({"time": t, "path": f"/v2/radar/nowcast_{os.urandom(6).hex()}"})
+        t = now + i * RADAR_BUCKET_SECONDS
+        nowcast.append({"time": t, "path": f"/v2/{radar_path}/nowcast_{frame_id('nowcast', t)}"})
     satellite = []
     for i in range(3, -1, -1):
-        t = now - i * 600
-        satellite.append({"time": t, "path": f"/v2/satellite/{os.urandom(6).hex()}"})
+        t = now - i * RADAR_BUCKET_SECONDS
+        satellite.append({"time": t, "path": f"/v2/satellite/{frame_id('satellite', t)}"})
     return {"radar": {"past": past, "nowcast": nowcast}, "satellite": {"infrared": satellite}}
 
+@functools.lru_cache(maxsize=2 * (len(OWM_LAYERS) + 1))
+def weather_maps_payload(bucket: int, radar_path: str = "radar") -> Tuple[bytes, str]:
+    """Serialize weather-maps.json once per radar bucket (and layer) and return its bytes and ETag."""
+    ts = generate_timestamps(bucket, radar_path)
+    data = {
+        "version": "2.0",
+        "generated": bucket,
+        "host": BASE_URL,
+        "radar": ts["radar"],
+        "satellite": ts["satellite"]
+    }
+    body = json.dumps(data, separators=(",", ":")).encode()
+    return body, content_etag(body)
+
 @app.get("/")
 async def root():
     """Root endpoint for health check and info."""
@@ -266,53 +2381,112 @@ async def root():
 @app.get("/public/weather-maps.json", response_class=JSONResponse)
 @app.get("/public/weather-maps.json/", response_class=JSONResponse)
 @app.get("/public/weather-maps.json/{http_stuff:path}", response_class=JSONResponse)
-async def weather_maps_json(http_stuff: str = None):
+async def weather_maps_json(request: Request, http_stuff: str = None):
     """
     Serve RainViewer-compatible weather-maps.json for radar and satellite layers.
     Handles trailing slashes and extra path segments for compatibility.
+    The document only changes at each 10-minute update, so clients may cache it until then.
     """
-    ts = generate_timestamps()
-    data = {
-        "version": "2.0",
-        "generated": int(time.time()),
-        "host": BASE_URL,
-        "radar": ts["radar"],
-        "satellite": ts["satellite"]
-    }
-    return JSONResponse(
-        content=data,
+    bucket = current_bucket()
+    body, etag = weather_maps_payload(bucket)
+    return bucket_response(
+        request, body, bucket, etag,
+        headers={"Access-Control-Allow-Origin": "*"},
         media_type="application/json",
-        headers={
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0",
-            "Access-Control-Allow-Origin": "*"
-        }
     )
 
+@app.get("/public/{layer_name}/weather-maps.json", response_class=JSONResponse)
+@app.get("/public/{layer_name}/weather-maps.json/", response_class=JSONResponse)
+@app.get("/public/{layer_name}/weather-maps.json/{http_stuff:path}", response_class=JSONResponse)
+async def layer_weather_maps_json(request: Request, layer_name: str, http_stuff: str = None):
+    """
+    weather-maps.json whose radar frames point at the /v2/{layer}/... routes, so a client
+    configured with this URL shows e.g. clouds while others keep the default layer.
+    """
+    layer = resolve_layer(layer_name)
+    if layer is None:
+        return JSONResponse({"error": f"Unknown layer {layer_name!r}", "layers": list(OWM_LAYERS)}, status_code=404)
+    bucket = current_bucket()
+    body, etag = weather_maps_payload(bucket, layer)
+    return bucket_response(
+        request, body, bucket, etag,
+        headers={"Access-Control-Allow-Origin": "*"},
+        media_type="application/json",
+    )
+
+def request_colour_scheme(color: Optional[str]) -> Optional[str]:
+    """Colour scheme for a request's `?color=` (a scheme name or RainViewer id), else COLOUR_SCHEME."""
+    return parse_colour_scheme(color, COLOUR_SCHEME) if color else COLOUR_SCHEME
+
+# Nowcast routes are registered first so the radar routes' {timestamp} doesn't capture them
+@app.get("/v2/radar/nowcast_{nowcast_id}/{z}/{x}/{y}.png")
+async def nowcast_tile_standard(request: Request, nowcast_id: str, z: int, x: int, y: int, color: Optional[str] = None):
+    """
+    Standard RainViewer nowcast tile endpoint.
+    Returns a PNG tile for the given nowcast id, zoom, x, y.
+    """
+    logger.debug("Standard nowcast tile request: nowcast_id=%s, z=%d, x=%d, y=%d", nowcast_id, z, x, y)
+    return await fetch_and_return_tile(request, z, x, y, colour_scheme=request_colour_scheme(color))
+
+@app.get("/v2/radar/nowcast_{nowcast_id}/{x}/{z}/{lon}/{lat}/.png")
+async def nowcast_tile_topsky(
+    request: Request, nowcast_id: str, x: str, z: int, lon: str, lat: str, color: Optional[str] = None
+):
+    """
+    TopSky/EuroScope specific nowcast tile endpoint with lat/lon parameters.
+    Converts lat/lon to tile coordinates and fetches the correct OWM tile.
+    """
+    logger.debug("TopSky nowcast tile request: nowcast_id=%s, x=%s, z=%d, lon=%s, lat=%s", nowcast_id, x, z, lon, lat)
+    return await fetch_and_return_nowcast_tile(request, z, lon, lat, TILE_LAYER, request_colour_scheme(color))
+
+async def fetch_and_return_nowcast_tile(
+    request: Request, z: int, lon: str, lat: str, layer: str, colour_scheme: Optional[str]
+) -> Response:
+    """Serve the `layer` tile containing lat/lon at zoom z for a TopSky nowcast request."""
+    try:
+        lon_f = float(lon)
+        lat_f = float(lat)
+    except ValueError as e:
+        logger.warning("Error converting nowcast lon/lat: %s", e)
+        return blank_tile_response()
+
+    tile_x, tile_y = latlon_to_tile(lat_f, lon_f, z)
+    logger.debug("Converted lat/lon to tile_x=%d, tile_y=%d", tile_x, tile_y)
+    
+    # Use calculated tile coordinates (not the provided x value)
+    logger.debug("Using calculated coordinates: z=%d, x=%d, y=%d", z, tile_x, tile_y)
+    return await fetch_and_return_tile(request, z, tile_x, tile_y, layer, colour_scheme)
+
 @app.get("/v2/radar/{timestamp}/{z}/{x}/{y}.png")
-async def radar_tile_standard(timestamp: int, z: int, x: int, y: int):
+async def radar_tile_standard(request: Request, timestamp: int, z: int, x: int, y: int, color: Optional[str] = None):
     """
     Standard RainViewer radar tile endpoint.
     Returns a PNG tile for the given timestamp, zoom, x, y.
     """
-    print(f"Standard radar tile request: timestamp={timestamp}, z={z}, x={x}, y={y}")
-    tile_bytes = fetch_and_return_tile(z, x, y)
-    return Response(content=tile_bytes, media_type="image/png")
+    logger.debug("Standard radar tile request: timestamp=%s, z=%d, x=%d, y=%d", timestamp, z, x, y)
+    return await fetch_and_return_tile(request, z, x, y, colour_scheme=request_colour_scheme(color))
 
 @app.get("/v2/radar/{timestamp}/{size_str}/{zoom_str}/{lat_str}/{lon_str}/.png")
 async def radar_tile_topsky_stitched(
+    request: Request,
     timestamp: str,
     size_str: str,
     zoom_str: str,
     lat_str: str,
     lon_str: str,
+    layers: Optional[str] = None,
+    color: Optional[str] = None,
 ):
     """
     New TopSky endpoint that correctly interprets the URL format and generates stitched tiles.
     The URL format is: /v2/radar/{timestamp}/{size}/{zoom}/{lat}/{lon}/.png
+    An optional `?layers=clouds_new:0.5,precipitation_new` overrides the composite layers,
+    and `?color=` the colour scheme.
     """
-    print(f"Stitched TopSky Request: ts={timestamp}, size={size_str}, zoom={zoom_str}, lat={lat_str}, lon={lon_str}")
+    logger.debug(
+        "Stitched TopSky Request: ts=%s, size=%s, zoom=%s, lat=%s, lon=%s",
+        timestamp, size_str, zoom_str, lat_str, lon_str,
+    )
     try:
         # FastAPI's path converter can sometimes pass values like '512.0'
         # so we handle floats before converting to int.
@@ -322,101 +2496,233 @@ async def radar_tile_topsky_stitched(
         # We add +1 to the zoom level requested by the client.
         # This allows the client to request a wider area (lower zoom)
         # while the server fetches higher-resolution tiles for that area.
-        zoom = int(float(zoom_str)) + 1
-        print(f"Applying zoom multiplier: client zoom={zoom_str}, server fetch zoom={zoom}")
+        zoom = int(float(zoom_str)) + STITCH_ZOOM_OFFSET
+        logger.debug("Applying zoom multiplier: client zoom=%s, server fetch zoom=%d", zoom_str, zoom)
         # -------------------------
         lat = float(lat_str)
         lon = float(lon_str)
     except ValueError as e:
-        print(f"Error converting path parameters: {e}")
+        logger.warning("Error converting path parameters: %s", e)
         # Use a default size for the blank tile if conversion fails early
-        return Response(content=create_blank_tile(512, 512), media_type="image/png")
+        return blank_tile_response(512, 512)
+    try:
+        layer_stack = parse_layer_stack(layers) if layers else None
+    except ValueError as e:
+        logger.warning("Rejecting composite layers: %s", e)
+        return blank_tile_response(width, height)
 
+    bucket = current_bucket()
+    if not_modified_since(request, bucket):
+        return not_modified_response(bucket_cache_headers(bucket))
     try:
-        image_bytes = await create_stitched_tile(
-            zoom=zoom,
-            center_lat=lat,
-            center_lon=lon,
-            width=width,
-            height=height,
-        )
-        return Response(content=image_bytes, media_type="image/png")
+        with start_trace("stitched_tile", size=width, zoom=zoom, lat=lat, lon=lon) as trace:
+            image_bytes, bucket = await create_stitched_tile(
+                zoom=zoom,
+                center_lat=lat,
+                center_lon=lon,
+                width=width,
+                height=height,
+                layers=layer_stack or None,
+                colour_scheme=request_colour_scheme(color),
+            )
+        headers = {}
+        if trace is not None:
+            headers["Server-Timing"] = trace.server_timing(("cache", "fetch", "decode", "stitch", "recolour", "blend", "encode"))
+        if bucket is None:
+            # Some tiles failed, so make sure clients ask again instead of keeping the gaps
+            headers.update({"ETag": content_etag(image_bytes), "Cache-Control": "no-cache"})
+            return Response(content=image_bytes, media_type="image/png", headers=headers)
+        return bucket_response(request, image_bytes, bucket, headers=headers)
     except Exception as e:
-        print(f"Error creating stitched tile: {e}")
+        logger.exception("Error creating stitched tile: %s", e)
         # Return a blank tile of the requested size on error
-        return Response(content=create_blank_tile(width, height), media_type="image/png")
-
-@app.get("/v2/radar/nowcast_{nowcast_id}/{z}/{x}/{y}.png")
-async def nowcast_tile_standard(nowcast_id: str, z: int, x: int, y: int):
-    """
-    Standard RainViewer nowcast tile endpoint.
-    Returns a PNG tile for the given nowcast id, zoom, x, y.
-    """
-    print(f"Standard nowcast tile request: nowcast_id={nowcast_id}, z={z}, x={x}, y={y}")
-    tile_bytes = fetch_and_return_tile(z, x, y)
-    return Response(content=tile_bytes, media_type="image/png")
-
-@app.get("/v2/radar/nowcast_{nowcast_id}/{x}/{z}/{lon}/{lat}/.png")
-async def nowcast_tile_topsky(nowcast_id: str, x: str, z: int, lon: str, lat: str):
-    """
-    TopSky/EuroScope specific nowcast tile endpoint with lat/lon parameters.
-    Converts lat/lon to tile coordinates and fetches the correct OWM tile.
-    """
-    print(f"TopSky nowcast tile request: nowcast_id={nowcast_id}, x={x}, z={z}, lon={lon}, lat={lat}")
-    try:
-        lon_f = float(lon)
-        lat_f = float(lat)
-    except ValueError as e:
-        print(f"Error converting nowcast lon/lat: {e}")
-        return Response(content=create_blank_tile(), media_type="image/png")
-
-    tile_x, tile_y = latlon_to_tile(lat_f, lon_f, z)
-    print(f"Converted lat/lon to tile_x={tile_x}, tile_y={tile_y}")
-    
-    # Use calculated tile coordinates (not the provided x value)
-    print(f"Using calculated coordinates: z={z}, x={tile_x}, y={tile_y}")
-    tile_bytes = fetch_and_return_tile(z, tile_x, tile_y)
-    return Response(content=tile_bytes, media_type="image/png")
+        return blank_tile_response(width, height)
 
 @app.get("/v2/satellite/{satellite_id}/{z}/{x}/{y}.png")
 async def satellite_tile(satellite_id: str, z: int, x: int, y: int):
     """
     Satellite tile endpoint - returns blank tile as we're not implementing satellite data.
     """
-    print(f"Satellite tile request: satellite_id={satellite_id}, z={z}, x={x}, y={y}")
-    return Response(content=create_blank_tile(), media_type="image/png")
+    logger.debug("Satellite tile request: satellite_id=%s, z=%d, x=%d, y=%d", satellite_id, z, x, y)
+    return blank_tile_response()
+
+def resolve_layer(name: str) -> Optional[str]:
+    """Map a layer from a URL (`clouds_new`, or just `clouds`) to its OWM layer name, or None if unknown."""
+    for layer in (name, f"{name}_new"):
+        if layer in OWM_LAYERS:
+            return layer
+    return None
+
+# Per-layer routes, registered after the radar and satellite routes so those keep precedence.
+# The frame (timestamp or nowcast id) is ignored like on the radar routes: OWM serves current data.
+@app.get("/v2/{layer_name}/{frame}/{z}/{x}/{y}.png")
+async def layer_tile_standard(
+    request: Request, layer_name: str, frame: str, z: int, x: int, y: int, color: Optional[str] = None
+):
+    """Standard RainViewer-style tile for any OWM layer, e.g. /v2/clouds_new/{timestamp}/{z}/{x}/{y}.png."""
+    layer = resolve_layer(layer_name)
+    logger.debug("Layer tile request: layer=%s, frame=%s, z=%d, x=%d, y=%d", layer_name, frame, z, x, y)
+    if layer is None:
+        logger.info("Unknown layer requested: %s", layer_name)
+        return blank_tile_response()
+    return await fetch_and_return_tile(request, z, x, y, layer, request_colour_scheme(color))
+
+# Registered before the stitched layer route, which would otherwise misread TopSky's nowcast URLs
+@app.get("/v2/{layer_name}/nowcast_{nowcast_id}/{x}/{z}/{lon}/{lat}/.png")
+async def layer_nowcast_tile_topsky(
+    request: Request, layer_name: str, nowcast_id: str, x: str, z: int, lon: str, lat: str,
+    color: Optional[str] = None,
+):
+    """TopSky nowcast tile for any OWM layer, like /v2/radar/nowcast_{id}/{x}/{z}/{lon}/{lat}/.png."""
+    layer = resolve_layer(layer_name)
+    logger.debug("Layer nowcast tile request: layer=%s, nowcast_id=%s, z=%d, lon=%s, lat=%s", layer_name, nowcast_id, z, lon, lat)
+    if layer is None:
+        logger.info("Unknown layer requested: %s", layer_name)
+        return blank_tile_response()
+    return await fetch_and_return_nowcast_tile(request, z, lon, lat, layer, request_colour_scheme(color))
+
+@app.get("/v2/{layer_name}/{frame}/{size_str}/{zoom_str}/{lat_str}/{lon_str}/.png")
+async def layer_tile_topsky_stitched(
+    request: Request,
+    layer_name: str,
+    frame: str,
+    size_str: str,
+    zoom_str: str,
+    lat_str: str,
+    lon_str: str,
+    color: Optional[str] = None,
+):
+    """TopSky stitched image for any OWM layer, e.g. /v2/clouds_new/{timestamp}/{size}/{zoom}/{lat}/{lon}/.png."""
+    layer = resolve_layer(layer_name)
+    if layer is None:
+        logger.info("Unknown layer requested: %s", layer_name)
+        try:
+            size = int(float(size_str))
+        except ValueError:
+            size = 512
+        return blank_tile_response(size, size)
+    return await radar_tile_topsky_stitched(
+        request, frame, size_str, zoom_str, lat_str, lon_str, layers=layer, color=color
+    )
 
 @app.get("/health")
 async def health():
     """Health check endpoint with version information."""
+    # Degraded while any upstream circuit is open or probing: tiles may be stale or blank
+    degraded = any(breaker.state != CircuitBreaker.CLOSED for breaker in circuit_breakers.values())
     return {
-        "status": "healthy", 
+        "status": "degraded" if degraded else "healthy",
         "version": __version__,
         "timestamp": int(time.time()),
-        "config_source": "config.ini" if os.path.exists("config.ini") else "environment"
+        "config_source": "config.ini" if os.path.exists("config.ini") else "environment",
+        "tile_cache": {layer: cache.stats() for layer, cache in tile_caches.items()},
+        "stitched_cache": stitched_cache.stats(),
+        "empty_tiles": empty_tiles.stats(),
+        "prefetch": {"enabled": PREFETCH_ENABLED, **prefetch_stats},
+        "disk_cache": disk_cache.stats() if disk_cache is not None else {"enabled": False},
+        "upstream": {
+            "inflight_fetches": len(inflight_fetches),
+            "coalesced_fetches": coalesced_fetches,
+            "limiter": upstream_limiter.stats(),
+            "limiters": {layer: limiter.stats() for layer, limiter in upstream_limiters.items()},
+            "circuit_breakers": {breaker.name: breaker.stats() for breaker in circuit_breakers.values()}
+        },
+        "image_executor": {
+            "type": IMAGE_EXECUTOR,
+            "workers": IMAGE_WORKERS,
+            "max_queue": IMAGE_MAX_QUEUE,
+            "running": image_jobs_running,
+            "waiting": image_jobs_waiting
+        }
     }
 
+def _all_cache_stats() -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+    """Metric labels and stats of every cache; tile cache partitions are also labelled by layer."""
+    caches = [({"cache": "tile", "layer": layer}, cache.stats()) for layer, cache in tile_caches.items()]
+    caches.append(({"cache": "stitched"}, stitched_cache.stats()))
+    if disk_cache is not None:
+        caches.append(({"cache": "disk"}, disk_cache.stats()))
+    return caches
+
+def _cache_samples(field: str):
+    """Build a metric callback that reports one field of every cache's stats, labelled by cache."""
+    return lambda: [(labels, stats[field]) for labels, stats in _all_cache_stats()]
+
+def _cache_hit_ratio_samples():
+    samples = []
+    for labels, stats in _all_cache_stats():
+        lookups = stats["hits"] + stats["misses"]
+        samples.append((labels, stats["hits"] / lookups if lookups else 0.0))
+    return samples
+
+for _name, _kind, _field, _doc in [
+    ("wxr_cache_hits_total", "counter", "hits", "Cache lookups that found a fresh entry, by cache."),
+    ("wxr_cache_misses_total", "counter", "misses", "Cache lookups that found nothing usable, by cache."),
+    ("wxr_cache_evictions_total", "counter", "evictions", "Entries evicted to stay within the cache budget, by cache."),
+    ("wxr_cache_bytes", "gauge", "bytes", "Bytes currently held, by cache."),
+    ("wxr_cache_entries", "gauge", "entries", "Entries currently held, by cache."),
+]:
+    metrics.register(CallbackMetric(_name, _doc, _kind, _cache_samples(_field)))
+metrics.register(CallbackMetric("wxr_cache_hit_ratio", "Fraction of cache lookups that were hits, by cache.",
+                                "gauge", _cache_hit_ratio_samples))
+def _upstream_limiter_samples(attr: str):
+    limiters = [upstream_limiter, *upstream_limiters.values()]
+    return [({"layer": limiter.layer}, getattr(limiter, attr)) for limiter in limiters]
+
+metrics.register(CallbackMetric("wxr_upstream_requests_in_flight", "Upstream OWM requests currently being sent, by layer (all = every layer).",
+                                "gauge", lambda: _upstream_limiter_samples("active")))
+metrics.register(CallbackMetric("wxr_upstream_requests_queued", "Upstream OWM requests waiting for a limiter, by layer (all = shared limiter).",
+                                "gauge", lambda: _upstream_limiter_samples("waiting")))
+metrics.register(CallbackMetric("wxr_upstream_coalesced_total", "Tile fetches that joined an identical in-flight request.",
+                                "counter", lambda: [({}, coalesced_fetches)]))
+
+def _circuit_samples(value: Callable[[CircuitBreaker], float]):
+    """Build a metric callback reporting `value` for every circuit breaker, labelled by host and layer."""
+    return lambda: [({"host": host, "layer": layer}, value(breaker)) for (host, layer), breaker in circuit_breakers.items()]
+
+_CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+metrics.register(CallbackMetric("wxr_upstream_circuit_state", "Upstream circuit state: 0 closed, 1 half-open, 2 open.",
+                                "gauge", _circuit_samples(lambda breaker: _CIRCUIT_STATE_VALUES[breaker.state])))
+metrics.register(CallbackMetric("wxr_upstream_circuit_trips_total", "Times the upstream circuit opened.",
+                                "counter", _circuit_samples(lambda breaker: breaker.trips)))
+metrics.register(CallbackMetric("wxr_upstream_circuit_rejected_total", "Upstream requests rejected by an open circuit.",
+                                "counter", _circuit_samples(lambda breaker: breaker.rejected)))
+metrics.register(CallbackMetric("wxr_image_jobs_running", "Image jobs currently running on the image executor.",
+                                "gauge", lambda: [({}, image_jobs_running)]))
+metrics.register(CallbackMetric("wxr_image_jobs_waiting", "Image jobs waiting for a free image executor slot.",
+                                "gauge", lambda: [({}, image_jobs_waiting)]))
+metrics.register(CallbackMetric("wxr_empty_tiles_skipped_total", "Upstream tiles skipped because they are known to be empty.",
+                                "counter", lambda: [({}, empty_tiles.skipped)]))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def catch_all(path: str):
     """
     Catch-all route for unmatched requests.
     Returns a blank PNG for .png requests, or a JSON 404 for others.
     """
-    print(f"Unexpected request to: /{path}")
+    logger.info("Unexpected request to: /%s", path)
     if path.endswith('.png'):
-        print("Returning blank tile for unexpected PNG request")
-        return Response(content=create_blank_tile(), media_type="image/png")
+        logger.debug("Returning blank tile for unexpected PNG request")
+        return blank_tile_response()
     return JSONResponse({"error": "Not found", "path": path, "message": "Check your TopSky configuration"}, status_code=404)
 
 if __name__ == "__main__":
     import uvicorn
+    # Required for the process image executor in the PyInstaller executable
+    multiprocessing.freeze_support()
     # Startup info
-    print("Starting RainViewer Spoof API for TopSky...")
-    print(f"Base URL: {BASE_URL}")
-    print(f"OpenWeatherMap API Key: {'*' * (len(OPENWEATHER_API_KEY) - 4) + OPENWEATHER_API_KEY[-4:]}")
-    print("Server will be available at: http://localhost:8000")
-    print(f"Weather data endpoint: {BASE_URL}/public/weather-maps.json")
-    print("Format: RainViewer-compatible API v2.0")
-    print("PNG Format: Maximum compatibility for TopSky plugin")
-    print("NOTE: Debug route removed - only real OWM tiles or blank tiles will be served")
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    logger.info("Starting RainViewer Spoof API for TopSky...")
+    logger.info("Base URL: %s", BASE_URL)
+    logger.info("OpenWeatherMap API Key: %s", '*' * (len(OPENWEATHER_API_KEY) - 4) + OPENWEATHER_API_KEY[-4:])
+    logger.info("Server will be available at: http://localhost:8000")
+    logger.info("Weather data endpoint: %s/public/weather-maps.json", BASE_URL)
+    logger.info("Format: RainViewer-compatible API v2.0")
+    logger.info("PNG Format: Maximum compatibility for TopSky plugin")
+    logger.info("NOTE: Debug route removed - only real OWM tiles or blank tiles will be served")
+    # Logging is already set up above; uvicorn's synchronous access log would duplicate ours
+    uvicorn.run(app, host="0.0.0.0", port=8000, access_log=False, log_config=None) 
\ No newline at end of file
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Import main.py with environment settings only: this folder has no config.ini, and the
+# dummy API key is never sent anywhere because the tests mock the upstream client.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENWEATHER_API_KEY", "test")
+os.environ.setdefault("LOGGING_ACCESS_LOG", "false")
+sys.path.insert(0, REPO_ROOT)
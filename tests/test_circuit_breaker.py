@@ -0,0 +1,71 @@
+import pytest
+
+import main
+from main import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_breaker():
+    return CircuitBreaker("test", window=30, min_requests=4, error_rate=0.5, slow_call_seconds=5,
+                          slow_call_rate=0.8, open_seconds=30, half_open_probes=1)
+
+
+def trip(breaker):
+    for _ in range(4):
+        assert breaker.allow() == (True, False)
+        breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_trips_and_rejects_until_open_seconds_pass(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.rejecting()
+    assert breaker.allow() == (False, False)
+    clock[0] += 31
+    assert not breaker.rejecting()
+    assert breaker.allow() == (True, True)
+    # Only one probe at a time
+    assert breaker.allow() == (False, False)
+    assert breaker.rejected == 3
+
+
+@pytest.mark.parametrize("ok, state", [(True, CircuitBreaker.CLOSED), (False, CircuitBreaker.OPEN)])
+def test_probe_outcome_closes_or_reopens(clock, ok, state):
+    breaker = make_breaker()
+    trip(breaker)
+    clock[0] += 31
+    assert breaker.allow() == (True, True)
+    breaker.record(ok, 0.1, probe=True)
+    assert breaker.state == state
+    assert breaker.trips == (1 if ok else 2)
+
+
+@pytest.mark.parametrize("late_ok", [True, False])
+def test_requests_admitted_before_the_trip_do_not_decide_half_open(clock, late_ok):
+    breaker = make_breaker()
+    assert breaker.allow() == (True, False)  # slow request, still in flight when the circuit trips
+    trip(breaker)
+    clock[0] += 31
+    assert breaker.allow() == (True, True)
+    breaker.record(late_ok, 40.0)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() == (False, False)
+    breaker.record(True, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_frees_its_slot(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock[0] += 31
+    assert breaker.allow() == (True, True)
+    breaker.record(None, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() == (True, True)
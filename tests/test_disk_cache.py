@@ -0,0 +1,64 @@
+import os
+import time
+
+from main import DiskCache
+
+
+def make_cache(tmp_path, max_bytes=1024):
+    cache = DiskCache(str(tmp_path), max_bytes)
+    cache.load()
+    return cache
+
+
+def test_rewriting_same_content_keeps_object(tmp_path):
+    cache = make_cache(tmp_path)
+    expires = time.time() + 60
+    cache.set("a", b"hello", expires)
+    cache.set("a", b"hello", expires)
+    assert cache.get("a") == b"hello"
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 5
+
+
+def test_rewriting_with_new_content_removes_old_object(tmp_path):
+    cache = make_cache(tmp_path)
+    expires = time.time() + 60
+    cache.set("a", b"hello", expires)
+    old_path = cache._object_path(cache._index["a"]["digest"])
+    cache.set("a", b"world", expires)
+    assert cache.get("a") == b"world"
+    assert not os.path.exists(old_path)
+    assert cache.stats()["bytes"] == 5
+
+
+def test_shared_content_is_stored_once(tmp_path):
+    cache = make_cache(tmp_path)
+    expires = time.time() + 60
+    cache.set("a", b"same", expires)
+    cache.set("b", b"same", expires)
+    assert cache.stats()["bytes"] == 4
+    cache.set("a", b"other", expires)
+    assert cache.get("b") == b"same"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=30)
+    expires = time.time() + 60
+    for key in ("a", "b", "c"):
+        cache.set(key, key.encode() * 10, expires)
+    assert cache.get("a") == b"a" * 10
+    cache.set("d", b"d" * 10, expires)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a" * 10
+    assert cache.get("c") == b"c" * 10
+    assert cache.stats()["evictions"] == 1
+
+
+def test_index_survives_reload(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", b"hello", time.time() + 60)
+    cache.set("gone", b"expired", time.time() - 1)
+    cache.save()
+    reloaded = make_cache(tmp_path)
+    assert reloaded.get("a") == b"hello"
+    assert reloaded.get("gone") is None
@@ -0,0 +1,29 @@
+import pytest
+
+from main import OWM_LAYERS, format_layer_stack, parse_layer_stack
+
+
+def test_parses_layers_bottom_first_with_opacity():
+    layers = parse_layer_stack(" clouds_new:0.5, precipitation_new ")
+    assert layers == (("clouds_new", 0.5), ("precipitation_new", 1.0))
+    assert format_layer_stack(layers) == "clouds_new@0.5+precipitation_new"
+
+
+def test_clamps_opacity():
+    assert parse_layer_stack("clouds_new:7,temp_new:-1") == (("clouds_new", 1.0), ("temp_new", 0.0))
+
+
+@pytest.mark.parametrize("value", [
+    "precipitation_new,precipitation_new",
+    "clouds_new:0.2,precipitation_new,clouds_new",
+    "bogus",
+    "clouds_new:x",
+    ",".join(["precipitation_new"] * 200),
+])
+def test_rejects_invalid_stacks(value):
+    with pytest.raises(ValueError):
+        parse_layer_stack(value)
+
+
+def test_every_layer_once_is_allowed():
+    assert len(parse_layer_stack(",".join(OWM_LAYERS))) == len(OWM_LAYERS)
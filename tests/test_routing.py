@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from io import BytesIO
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+
+
+def tile_png():
+    buf = BytesIO()
+    Image.new("RGBA", (256, 256), (80, 80, 225, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def clear_caches():
+    for cache in [*main.tile_caches.values(), main.stitched_cache]:
+        cache._entries.clear()
+        cache.current_bytes = 0
+
+
+@pytest.fixture
+def upstream_paths(monkeypatch):
+    """Serve every OWM request from a mock transport and record the requested tile paths."""
+    paths = []
+    data = tile_png()
+
+    def handler(request):
+        paths.append(request.url.path.split("/map/", 1)[1])
+        return httpx.Response(200, content=data, headers={"content-type": "image/png"})
+
+    monkeypatch.setattr(main, "create_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    clear_caches()
+    return paths
+
+
+def test_layer_nowcast_topsky_fetches_single_tile(upstream_paths):
+    with TestClient(main.app) as client:
+        resp = client.get("/v2/clouds_new/nowcast_abc/512/5/10.0/50.0/.png")
+    assert resp.status_code == 200
+    assert Image.open(BytesIO(resp.content)).size == (256, 256)
+    # Same tile as /v2/radar/nowcast_... : lon 10, lat 50 at zoom 5
+    assert upstream_paths == ["clouds_new/5/16/10.png"]
+
+
+def test_radar_nowcast_topsky_uses_default_layer(upstream_paths):
+    with TestClient(main.app) as client:
+        resp = client.get("/v2/radar/nowcast_abc/512/5/10.0/50.0/.png")
+    assert resp.status_code == 200
+    assert upstream_paths == [f"{main.TILE_LAYER}/5/16/10.png"]
+
+
+def test_layer_stitched_route_still_stitches(upstream_paths):
+    with TestClient(main.app) as client:
+        resp = client.get("/v2/clouds/1700000000/512/4/50.0/8.0/.png")
+    assert resp.status_code == 200
+    assert Image.open(BytesIO(resp.content)).size == (512, 512)
+    assert upstream_paths and all(path.startswith("clouds_new/") for path in upstream_paths)
+
+
+def test_unknown_layer_gets_blank_tile(upstream_paths):
+    with TestClient(main.app) as client:
+        resp = client.get("/v2/bogus/nowcast_abc/512/5/10.0/50.0/.png")
+    assert resp.status_code == 200
+    assert resp.headers["etag"].startswith('"blank-')
+    assert upstream_paths == []
+
+
+def test_layers_share_the_global_upstream_limit(monkeypatch):
+    data = tile_png()
+    active = Counter()
+    peaks = Counter()
+
+    async def handler(request):
+        layer = request.url.path.split("/map/", 1)[1].split("/", 1)[0]
+        active[layer] += 1
+        active["all"] += 1
+        for key in (layer, "all"):
+            peaks[key] = max(peaks[key], active[key])
+        await asyncio.sleep(0.02)
+        active[layer] -= 1
+        active["all"] -= 1
+        return httpx.Response(200, content=data, headers={"content-type": "image/png"})
+
+    monkeypatch.setattr(main, "create_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main, "upstream_limiter", main.UpstreamLimiter("all", 3, 0.0, 1))
+    monkeypatch.setattr(main, "upstream_limiters", {})
+    monkeypatch.setattr(main, "UPSTREAM_LAYER_MAX_CONCURRENT_FETCHES", 2)
+    clear_caches()
+
+    with TestClient(main.app) as client:
+        resp = client.get("/v2/radar/1/512/4/50.0/8.0/.png?layers=clouds_new,precipitation_new")
+    assert resp.status_code == 200
+    assert peaks["all"] == 3
+    assert peaks["clouds_new"] <= 2 and peaks["precipitation_new"] <= 2
+
+
+def test_responses_do_not_wait_for_disk_cache_writes(upstream_paths, monkeypatch, tmp_path):
+    released = threading.Event()
+
+    class SlowDiskCache(main.DiskCache):
+        def set(self, key, value, expires_at):
+            released.wait(5)
+            super().set(key, value, expires_at)
+
+    cache = SlowDiskCache(str(tmp_path), 1024 * 1024)
+    monkeypatch.setattr(main, "disk_cache", cache)
+    with TestClient(main.app) as client:
+        resp = client.get("/v2/radar/1/5/16/10.png")
+        assert resp.status_code == 200
+        assert cache.stats()["entries"] == 0
+        released.set()
+    # Shutdown waits for pending writes
+    assert cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("failure", [
+    httpx.Response(500),
+    httpx.ConnectError("[Errno 111] Connection refused"),
+])
+def test_upstream_errors_are_logged_without_the_api_key(monkeypatch, failure):
+    def handler(request):
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    monkeypatch.setattr(main, "create_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main, "OPENWEATHER_API_KEY", "secret-api-key-1234")
+    monkeypatch.setattr(main, "circuit_breakers", {})
+    clear_caches()
+    records = []
+    capture = logging.Handler()
+    capture.emit = records.append
+    main.logger.addHandler(capture)
+    try:
+        with TestClient(main.app) as client:
+            resp = client.get("/v2/radar/1/5/16/10.png")
+    finally:
+        main.logger.removeHandler(capture)
+    assert resp.status_code == 200
+    messages = [record.getMessage() for record in records if record.levelno >= logging.WARNING]
+    assert any("precipitation_new/5/16/10.png" in message for message in messages)
+    assert not any("secret-api-key" in message for message in messages)
+
+
+def test_startup_builds_every_colour_lut(upstream_paths):
+    main.owm_intensity_lut.cache_clear()
+    main.recolour_lut.cache_clear()
+    with TestClient(main.app):
+        assert main.owm_intensity_lut.cache_info().currsize == 1
+        assert main.recolour_lut.cache_info().currsize == len(main.COLOUR_SCHEMES)
+
+
+@pytest.mark.parametrize("url", ["/v2/radar/1/5/16/10.png", "/v2/radar/1/512/4/50.0/8.0/.png"])
+@pytest.mark.parametrize("failure", ["error", "timeout"])
+def test_serves_stale_copy_when_refresh_fails_or_is_slow(monkeypatch, url, failure):
+    mode = {"failure": None}
+    data = tile_png()
+
+    async def handler(request):
+        if mode["failure"] == "error":
+            return httpx.Response(503)
+        if mode["failure"] == "timeout":
+            await asyncio.sleep(0.3)
+        return httpx.Response(200, content=data, headers={"content-type": "image/png"})
+
+    real_time = time.time
+    offset = [0.0]
+    monkeypatch.setattr(main.time, "time", lambda: real_time() + offset[0])
+    monkeypatch.setattr(main, "create_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main, "CACHE_REVALIDATE_TIMEOUT", 0.05)
+    monkeypatch.setattr(main, "circuit_breakers", {})
+    clear_caches()
+    with TestClient(main.app) as client:
+        fresh = client.get(url)
+        assert fresh.status_code == 200
+        assert "X-Cache-Status" not in fresh.headers
+
+        # Next radar update: the cached copy has expired and refreshing it fails or takes too long
+        offset[0] = main.RADAR_BUCKET_SECONDS
+        mode["failure"] = failure
+        stale = client.get(url)
+        assert stale.status_code == 200
+        assert stale.content == fresh.content
+        assert stale.headers["X-Cache-Status"] == "stale"
+        assert "max-age=0" in stale.headers["Cache-Control"]
+        if failure == "timeout":
+            # Let the refresh carrying on in the background finish before shutdown
+            time.sleep(0.4)
@@ -0,0 +1,31 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from main import stitch_tiles
+
+
+def png(colour, mode="RGBA"):
+    buf = BytesIO()
+    Image.new(mode, (256, 256), colour).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_clips_tiles_at_edges_like_paste():
+    placements = [(-100, -50, png((255, 0, 0, 255))), (200, 150, png((0, 0, 255, 128))), (300, 300, None)]
+    canvas, empty_indexes = stitch_tiles(placements, 400, 300)
+    expected = Image.new("RGBA", (400, 300), (0, 0, 0, 0))
+    for paste_x, paste_y, tile_data in placements:
+        if tile_data:
+            expected.paste(Image.open(BytesIO(tile_data)), (paste_x, paste_y))
+    assert canvas.shape == (300, 400, 4)
+    assert canvas.tobytes() == expected.tobytes()
+    assert empty_indexes == []
+
+
+def test_reports_transparent_tiles_and_converts_other_modes():
+    placements = [(0, 0, png((10, 10, 200, 0))), (0, 0, png((0, 255, 0), mode="RGB"))]
+    canvas, empty_indexes = stitch_tiles(placements, 256, 256)
+    assert empty_indexes == [0]
+    assert (canvas == np.array([0, 255, 0, 255], dtype=np.uint8)).all()
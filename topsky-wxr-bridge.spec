@@ -49,6 +49,7 @@ a = Analysis(
         'httpx._config',
         'httpx._models',
         'httpx._exceptions',
+        'h2',
         'PIL',
         'PIL.Image',
         'PIL._tkinter_finder',